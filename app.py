@@ -1,13 +1,35 @@
 import os
 import sys
+import argparse
 import uvicorn
 
 # Add the project root directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-# Import the FastAPI app
-from src.api.main import app
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Start the TextGuard AI API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Number of prefork worker processes")
+    parser.add_argument("--state-path", default=os.getenv("SHARED_STATE_PATH", "textguard_state.db"),
+                        help="SQLite file holding counters and rate limits shared by workers")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parse_args()
     print("Starting TextGuard AI API...")
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+
+    if args.workers > 1:
+        from src.utils import SharedState
+
+        # Workers inherit the environment and open the same state file;
+        # counters start fresh on every launch while rate limits persist
+        os.environ["SHARED_STATE_PATH"] = args.state_path
+        SharedState(args.state_path).reset_counters()
+        print(f"Starting {args.workers} workers sharing state in {args.state_path}")
+        uvicorn.run("src.api.main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        # Import the FastAPI app
+        from src.api.main import app
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,62 @@
+"""
+Benchmark per-request CPU spent building and keying the upstream request body.
+
+Compares the previous approach (fresh payload dict, json.dumps of the options
+for the cache key, payload.update(options), json.dumps of the whole payload as
+aiohttp does for json=) against prebuilt per-tier byte templates. Usage:
+
+    python benchmarks/bench_payload.py
+"""
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.payload import PayloadTemplates
+from src.core.preflight import cache_key_text
+from src.utils import get_tier_config
+
+TEXT = ("URGENT! You have won a 1 week FREE membership in our £100,000 Prize Jackpot! "
+        "Txt the word: CLAIM to No: 81010 T&C www.dbuk.net LCCLTD POBOX 4403LDNW1A7RW18")
+
+def build_before(text, options, tier):
+    cache_key = f"{text}:{json.dumps(options or {})}"
+    payload = {
+        "model": "deepseek-chat",
+        "messages": [{"role": "user", "content": text}],
+        "tier": tier
+    }
+    if options:
+        payload.update(options)
+    return cache_key, json.dumps(payload).encode("utf-8")
+
+def build_after(templates, text, options, tier):
+    options_key = templates.options_key(tier, options)
+    cache_key = (tier, options_key, cache_key_text(text))
+    return cache_key, templates.render(tier, options_key, text)
+
+def main():
+    templates = PayloadTemplates()
+    number = 200000
+    cases = [
+        ("no options", None),
+        ("with options", {"temperature": 0.2, "max_tokens": 256}),
+    ]
+    print(f"{'case':<14} {'before (us)':>12} {'after (us)':>11} {'speedup':>8}")
+    for name, options in cases:
+        before = timeit.timeit(lambda: build_before(TEXT, options, "basic"), number=number)
+        after = timeit.timeit(lambda: build_after(templates, TEXT, options, "basic"), number=number)
+        print(f"{name:<14} {before / number * 1e6:>12.2f} {after / number * 1e6:>11.2f} {before / after:>8.2f}")
+
+    # /tiers previously rebuilt and re-serialized the config on every request
+    get_tier_config.cache_clear()
+    rebuild = timeit.timeit(
+        lambda: (get_tier_config.cache_clear(), json.dumps(get_tier_config())), number=number
+    )
+    cached = timeit.timeit(lambda: get_tier_config(), number=number)
+    print(f"{'/tiers':<14} {rebuild / number * 1e6:>12.2f} {cached / number * 1e6:>11.2f} {rebuild / cached:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark prefilter matching cost against the number of rules.
+
+Compares the previous matcher (every rule, literal or regex, in one
+backtracking re alternation) against RuleMatcher (literal rules in an
+Aho-Corasick automaton, regex rules in a small alternation). The bundled
+regex rules are always included; the literal rules are random phrases that do
+not occur in the text, which is the common case for a prefilter. Usage:
+
+    python benchmarks/bench_prefilter.py
+"""
+import os
+import re
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.prefilter import load_rules, compile_rules
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'data', 'prefilter_rules.jsonl')
+WORDS = ("free win prize cash claim mobile offer call now urgent reply stop text "
+         "award bonus voucher ringtone club entry weekly draw chat date").split()
+
+def make_rules(count, rng):
+    rules = [rule for rule in load_rules(RULES_PATH) if rule.get("regex")]
+    for i in range(count):
+        phrase = " ".join(rng.choice(WORDS) for _ in range(3)) + f" {i:05d}"
+        rules.append({"id": f"literal_{i}", "pattern": phrase, "label": "spam"})
+    return rules
+
+def compile_before(rules):
+    parts = [f"({rule['pattern'] if rule.get('regex') else re.escape(rule['pattern'])})" for rule in rules]
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+def make_text(length, rng):
+    words = []
+    while sum(len(word) + 1 for word in words) < length:
+        words.append(rng.choice(WORDS + ["hello", "see", "you", "at", "the", "station", "later"]))
+    return " ".join(words)[:length]
+
+def main():
+    rng = random.Random(0)
+    print(f"{'rules':>6} {'text':>6} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for count, length in [(200, 1100), (1000, 4000), (5000, 4000), (20000, 4000)]:
+        rules = make_rules(count, rng)
+        text = make_text(length, rng)
+        matcher = compile_rules(rules)
+        number = 20
+        after = timeit.timeit(lambda: matcher.search(text), number=number) / number
+        if count <= 1000:
+            # The alternation takes seconds per text beyond a few thousand rules
+            before_pattern = compile_before(rules)
+            before = timeit.timeit(lambda: before_pattern.search(text), number=3) / 3
+            print(f"{count:>6} {length:>6} {before * 1e3:>12.2f} {after * 1e3:>11.3f} {before / after:>8.0f}")
+        else:
+            print(f"{count:>6} {length:>6} {'-':>12} {after * 1e3:>11.3f} {'-':>8}")
+
+if __name__ == '__main__':
+    main()
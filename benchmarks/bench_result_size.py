@@ -0,0 +1,74 @@
+"""
+Benchmark memory per cache entry and /batch response size.
+
+Compares the previous format (the full chat-completion response cached in a
+dict with a datetime, and returned per item together with the original text)
+against the compact ClassificationResult. Usage:
+
+    python benchmarks/bench_result_size.py
+"""
+import os
+import sys
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.results import ClassificationResult
+
+TEXT = ("URGENT! You have won a 1 week FREE membership in our £100,000 Prize Jackpot! "
+        "Txt the word: CLAIM to No: 81010 T&C www.dbuk.net LCCLTD POBOX 4403LDNW1A7RW18")
+
+def make_response(i):
+    # Shaped like a DeepSeek chat-completion response
+    return json.loads(json.dumps({
+        "id": f"chatcmpl-{i:032x}",
+        "object": "chat.completion",
+        "created": 1760000000 + i,
+        "model": "deepseek-chat",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"label": "spam", "score": 0.97}'},
+            "logprobs": None,
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 52, "completion_tokens": 12, "total_tokens": 64},
+        "system_fingerprint": "fp_3a5770e1b4_prod0820_fp8_kvcache"
+    }))
+
+def cache_before(i):
+    return {"result": make_response(i), "timestamp": datetime.now()}
+
+def cache_after(i):
+    return (time.time(), ClassificationResult.from_response(make_response(i), latency=0.42))
+
+def bytes_per_entry(build, count):
+    # Only memory the cache keeps alive is counted; in the compact case the
+    # parsed response is freed once the result has been extracted
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    cache = {i: build(i) for i in range(count)}
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del cache
+    return used / count
+
+def main():
+    count = 20000
+    before = bytes_per_entry(cache_before, count)
+    after = bytes_per_entry(cache_after, count)
+    print(f"{'metric':<24} {'before':>10} {'after':>10} {'ratio':>7}")
+    print(f"{'cache entry (bytes)':<24} {before:>10.0f} {after:>10.0f} {before / after:>7.1f}")
+
+    # One /batch item, serialized as the API returns it
+    item_before = {"result": make_response(0), "text": TEXT, "status": "success"}
+    item_after = {"result": ClassificationResult.from_response(make_response(0), latency=0.42).to_dict(),
+                  "status": "success"}
+    size_before = len(json.dumps(item_before).encode("utf-8"))
+    size_after = len(json.dumps(item_after).encode("utf-8"))
+    print(f"{'batch item (bytes)':<24} {size_before:>10} {size_after:>10} {size_before / size_after:>7.1f}")
+
+if __name__ == '__main__':
+    main()
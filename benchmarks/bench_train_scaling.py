@@ -0,0 +1,78 @@
+"""
+Benchmark CPU data-parallel training throughput from 1 to N worker processes.
+
+Each run goes through train.train_distributed, the same path as
+`train.py --workers N`: one DistributedDataParallel (gloo backend) process
+per worker, each streaming its row shard of the corpus through
+StreamingSMSDataset into train_model. Worker threads default to
+cpu_count // workers, as in train.py. The corpus is the bundled SMS
+collection repeated --repeat times, and the timings are wall-clock,
+including process start-up and feature hashing. Usage:
+
+    python benchmarks/bench_train_scaling.py --max-workers 8 --repeat 10
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.core.train import parse_args, train_distributed
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'data', 'SMSSpamCollection')
+
+def write_corpus(path, repeat):
+    with open(DATA_PATH) as f:
+        rows = f.read().splitlines()
+    with open(path, 'w') as f:
+        for _ in range(repeat):
+            f.write('\n'.join(rows) + '\n')
+    return len(rows) * repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Intra-op threads per worker (default: cpu_count // workers)')
+    parser.add_argument('--repeat', type=int, default=4, help='Times to repeat the bundled corpus')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=1)
+    parser.add_argument('--master-port', type=int, default=29600)
+    args = parser.parse_args()
+
+    world_sizes = [1]
+    while world_sizes[-1] * 2 <= args.max_workers:
+        world_sizes.append(world_sizes[-1] * 2)
+    if world_sizes[-1] != args.max_workers:
+        world_sizes.append(args.max_workers)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'corpus.tsv')
+        rows = write_corpus(data_path, args.repeat)
+        for world_size in world_sizes:
+            argv = [
+                '--data', data_path, '--output', os.path.join(tmp, 'model.pt'),
+                '--workers', str(world_size), '--epochs', str(args.epochs),
+                '--batch-size', str(args.batch_size), '--master-port', str(args.master_port + world_size)
+            ]
+            if args.threads is not None:
+                argv += ['--threads', str(args.threads)]
+            train_args = parse_args(argv)
+            # A single worker runs in this process and leaves its rendezvous port set
+            os.environ.pop('MASTER_PORT', None)
+            start = time.perf_counter()
+            train_distributed(train_args)
+            elapsed = time.perf_counter() - start
+            results.append((world_size, train_args.threads, rows * args.epochs / elapsed))
+
+    print(f"\n{'workers':>8} {'threads':>8} {'samples/sec':>12} {'speedup':>8} {'efficiency':>10}")
+    baseline = results[0][2]
+    for world_size, threads, throughput in results:
+        speedup = throughput / baseline
+        print(f"{world_size:>8} {threads:>8} {throughput:>12.0f} {speedup:>8.2f} {speedup / world_size:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,7 @@ setup(
         "python-multipart>=0.0.6",
         "typing-extensions>=4.8.0",
         "tenacity>=8.2.3",
+        "pyahocorasick>=2.0.0",
     ],
     extras_require={
         "dev": [
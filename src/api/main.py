@@ -1,10 +1,15 @@
 import os
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Depends
+import json
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from src.core import DeepSeekMCPClient
-from src.utils import get_tier_config
+from src.core import (
+    DeepSeekMCPClient, JobManager, JobNotFoundError, ModelStore, OnlineLearner, ModelWatcher, Prefilter
+)
+from src.core.serving import load_holdout
+from src.utils import get_tier_config, TierConfig, SharedState
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -22,20 +27,124 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MCP client
+# Counters and rate limits shared by all workers (see app.py --workers)
+shared_state = SharedState(os.getenv("SHARED_STATE_PATH", ":memory:"))
+tier_config = TierConfig(shared_state)
+
+# Initialize MCP client, load balancing over comma-separated DEEPSEEK_BASE_URLS
+upstream_concurrency = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "64"))
 client = DeepSeekMCPClient(
-    api_key=os.getenv("DEEPSEEK_API_KEY", "your-api-key-here")
+    api_key=os.getenv("DEEPSEEK_API_KEY", "your-api-key-here"),
+    state=shared_state,
+    base_urls=[
+        {"url": url.strip(), "max_concurrency": upstream_concurrency}
+        for url in os.getenv("DEEPSEEK_BASE_URLS", "https://api.deepseek.com/v1").split(",")
+        if url.strip()
+    ]
+)
+
+# Initialize background job manager
+job_manager = JobManager(
+    client,
+    jobs_dir=os.getenv("JOBS_DIR", "jobs"),
+    max_workers=int(os.getenv("JOB_WORKERS", "8")),
+    chunk_size=int(os.getenv("JOB_CHUNK_SIZE", "500"))
+)
+
+# Initialize local serving model, online learner and hot-reload watcher
+model_dir = os.getenv("MODEL_DIR", "models")
+model_store = ModelStore.from_checkpoint(
+    os.getenv("MODEL_PATH", os.path.join("src", "models", "best_model.pt"))
+)
+model_watcher = ModelWatcher(
+    model_store,
+    model_dir,
+    *load_holdout(
+        os.getenv("HOLDOUT_PATH", os.path.join("src", "data", "SMSSpamCollection")),
+        sample_size=int(os.getenv("HOLDOUT_SIZE", "500"))
+    ),
+    min_accuracy=float(os.getenv("MODEL_MIN_ACCURACY", "0.9")),
+    poll_interval=float(os.getenv("MODEL_POLL_INTERVAL", "5"))
 )
+# Serve the newest checkpoint in the model directory that passes validation
+model_watcher.check()
+learner = OnlineLearner(
+    model_store,
+    checkpoint_dir=model_dir,
+    batch_size=int(os.getenv("FEEDBACK_BATCH_SIZE", "32")),
+    watcher=model_watcher
+)
+
+# Decide texts matching known spam rules before any model
+prefilter_rules = os.getenv("PREFILTER_RULES", os.path.join("src", "data", "prefilter_rules.jsonl"))
+prefilter = Prefilter(prefilter_rules) if os.path.exists(prefilter_rules) else None
+if prefilter is not None:
+    client.set_prefilter(prefilter)
+
+# Route only uncertain texts upstream once the local model has been calibrated
+calibration_path = os.getenv("CALIBRATION_PATH", os.path.join(model_dir, "calibration.json"))
+if os.path.exists(calibration_path):
+    with open(calibration_path) as f:
+        client.set_cascade(model_store, json.load(f))
 
 class TextRequest(BaseModel):
     text: str
     tier: Optional[str] = "free"
     options: Optional[Dict[str, Any]] = None
+    raw: Optional[bool] = False
 
 class BatchRequest(BaseModel):
     texts: list[str]
     tier: Optional[str] = "free"
     options: Optional[Dict[str, Any]] = None
+    pack: Optional[bool] = False
+    raw: Optional[bool] = False
+
+class JobRequest(BaseModel):
+    texts: list[str]
+    tier: Optional[str] = "free"
+    options: Optional[Dict[str, Any]] = None
+
+class FeedbackRequest(BaseModel):
+    texts: list[str]
+    labels: list[str]
+
+@app.on_event("startup")
+async def start_job_manager():
+    """Start the background job runner and resume unfinished jobs."""
+    await job_manager.start()
+
+@app.on_event("startup")
+async def start_model_watcher():
+    """Start watching the model directory for new versions."""
+    model_watcher.start()
+
+@app.on_event("startup")
+async def start_prefilter_reload():
+    """Start watching the prefilter rules file for changes."""
+    if prefilter is not None:
+        prefilter.start()
+
+@app.on_event("shutdown")
+async def stop_prefilter_reload():
+    """Stop watching the prefilter rules file."""
+    if prefilter is not None:
+        prefilter.stop()
+
+@app.on_event("shutdown")
+async def stop_job_manager():
+    """Stop the background job runner."""
+    await job_manager.stop()
+
+@app.on_event("shutdown")
+async def stop_model_watcher():
+    """Stop watching the model directory."""
+    model_watcher.stop()
+
+@app.on_event("shutdown")
+async def flush_shared_state():
+    """Write counters aggregated since the last periodic flush."""
+    shared_state.flush()
 
 @app.get("/")
 async def root():
@@ -51,10 +160,39 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+# The tier configuration is static, so serialize it once
+TIERS_BODY = json.dumps(get_tier_config()).encode("utf-8")
+
 @app.get("/tiers")
 async def get_tiers():
     """Get available API tiers and their configurations."""
-    return get_tier_config()
+    return Response(content=TIERS_BODY, media_type="application/json")
+
+def check_tier(tier: str):
+    """Reject unknown tiers before they reach the rate limiter or the client."""
+    if tier not in tier_config.tier_limits:
+        raise HTTPException(status_code=400, detail="Tier must be one of: free, basic, premium")
+
+def check_size(tier: str, texts: List[str], limit_name: str):
+    """Reject submissions with more texts than the tier allows for the endpoint."""
+    limit = tier_config.tier_limits[tier][limit_name]
+    if len(texts) > limit:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {limit} texts are allowed per request on the {tier} tier")
+
+def check_options(tier: str, options: Optional[Dict[str, Any]]):
+    """Reject options the tier does not allow before any quota is charged."""
+    try:
+        client.templates.options_key(tier, options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def charge_request(tier: str):
+    """Count one request against the tier's daily limit, or reject it with 429."""
+    # acquire may wait for another worker's SQLite write lock, so keep it off
+    # the event loop
+    if not await run_in_threadpool(tier_config.acquire, tier):
+        raise HTTPException(status_code=429, detail="Daily request limit exceeded")
 
 @app.post("/analyze")
 async def analyze_text(request: TextRequest):
@@ -62,16 +200,23 @@ async def analyze_text(request: TextRequest):
     Analyze a single text using the specified tier.
     """
     try:
-        # Set tier
-        client.set_tier(request.tier)
+        # The client is shared, so the tier is passed per call
+        check_tier(request.tier)
+        check_options(request.tier, request.options)
+        await charge_request(request.tier)
+        shared_state.increment("texts_analyzed")
         
         # Process text
-        result = await client.process_text(request.text, request.options)
+        result = await client.process_text(request.text, request.options, raw=request.raw, tier=request.tier)
         
         return {
             "status": "success",
             "result": result
         }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -81,22 +226,108 @@ async def batch_analyze(request: BatchRequest):
     Analyze multiple texts in parallel using the specified tier.
     """
     try:
-        # Set tier
-        client.set_tier(request.tier)
+        # The client is shared, so the tier is passed per call
+        check_tier(request.tier)
+        check_size(request.tier, request.texts, "batch_size")
+        check_options(request.tier, request.options)
+        await charge_request(request.tier)
+        shared_state.increment("texts_analyzed", len(request.texts))
         
         # Process texts
-        results = await client.batch_process(request.texts, request.options)
+        results = await client.batch_process(request.texts, request.options, pack=request.pack,
+                                             raw=request.raw, tier=request.tier)
         
         return {
             "status": "success",
             "results": results
         }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def collect_stats() -> Dict[str, Any]:
+    """Get usage statistics from the client and shared state."""
+    stats = client.get_usage_stats()
+    stats["texts_analyzed"] = int(shared_state.get_counters().get("texts_analyzed", 0))
+    stats["rate_limits"] = {tier: tier_config.get_usage_stats(tier) for tier in tier_config.tier_limits}
+    return stats
+
 @app.get("/stats")
 async def get_stats():
     """
-    Get API usage statistics.
+    Get API usage statistics, aggregated over all workers.
+    """
+    # Reading the counters flushes and queries SQLite, so keep it off the event loop
+    return await run_in_threadpool(collect_stats)
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    """
+    Submit a large batch of texts for background processing.
+    """
+    check_tier(request.tier)
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Job must contain at least one text")
+    check_size(request.tier, request.texts, "job_size")
+    check_options(request.tier, request.options)
+    # Like a batch, a job counts as one request against the daily limit;
+    # its size is bounded by the tier's job_size instead
+    await charge_request(request.tier)
+    try:
+        job_id = await job_manager.submit(request.texts, request.tier, request.options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "success",
+        "job_id": job_id
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the status and progress of a background job.
     """
-    return client.get_usage_stats() 
\ No newline at end of file
+    try:
+        return job_manager.get_job(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, chunk: int = 0):
+    """
+    Get one chunk of results for a background job.
+    """
+    try:
+        return job_manager.get_results(job_id, chunk)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/feedback")
+async def submit_feedback(request: FeedbackRequest, background_tasks: BackgroundTasks):
+    """
+    Submit labelled messages ("spam" or "ham") for online model updates.
+    """
+    if any(label not in ("spam", "ham") for label in request.labels):
+        raise HTTPException(status_code=400, detail="Labels must be 'spam' or 'ham'")
+    try:
+        pending = learner.add_feedback(
+            request.texts, [int(label == "spam") for label in request.labels]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Train off the event loop once a full mini-batch is buffered
+    if pending >= learner.batch_size:
+        background_tasks.add_task(learner.update)
+
+    return {
+        "status": "success",
+        "pending": pending,
+        "model_version": model_store.version
+    }
@@ -1,5 +1,12 @@
 # Core module initialization
-from .integration import DeepSeekMCPClient
+from .integration import DeepSeekMCPClient, DeepSeekMCPError
 from .data_processor import DataProcessor
+from .jobs import JobManager, JobNotFoundError
+from .serving import ModelStore, OnlineLearner, ModelWatcher
+from .prefilter import Prefilter, PrefilterError
+from .upstream import Endpoint, UpstreamPool
+from .results import ClassificationResult
 
-__all__ = ['DeepSeekMCPClient', 'DataProcessor']
+__all__ = ['DeepSeekMCPClient', 'DeepSeekMCPError', 'DataProcessor', 'JobManager', 'JobNotFoundError',
+           'ModelStore', 'OnlineLearner', 'ModelWatcher', 'Prefilter', 'PrefilterError',
+           'Endpoint', 'UpstreamPool', 'ClassificationResult']
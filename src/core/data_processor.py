@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
 import re
+import random
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from torch.utils.data import Dataset, DataLoader
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from torch.utils.data import Dataset, IterableDataset, DataLoader, get_worker_info
 import torch
 import logging
 
@@ -32,6 +33,76 @@ class SMSDataset(Dataset):
             'labels': label
         }
 
+class StreamingSMSDataset(IterableDataset):
+    """
+    Iterable dataset that streams a labelled TSV file in chunks.
+
+    Each chunk is preprocessed and hashed into a fixed-size feature space, so
+    no vocabulary has to be fitted and peak memory depends only on chunk_size
+    and shuffle_buffer_size, not on the size of the file. Rows are sharded
+    round-robin across distributed ranks and DataLoader workers, so every
+    shard gets data even when the file has fewer chunks than shards.
+    """
+
+    def __init__(self, file_path, n_features=768, chunk_size=10000, shuffle_buffer_size=10000,
+                 seed=0, rank=0, world_size=1):
+        self.file_path = file_path
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Set the epoch so that each epoch is shuffled differently."""
+        self.epoch = epoch
+
+    def _iter_samples(self, shard, num_shards):
+        vectorizer = DataProcessor().hashing_vectorizer(self.n_features)
+        reader = pd.read_csv(self.file_path, sep='\t', names=['label', 'text'], chunksize=self.chunk_size)
+        start = 0
+        for chunk in reader:
+            # Keep the rows whose index in the file is shard modulo num_shards
+            offset = (shard - start) % num_shards
+            start += len(chunk)
+            chunk = chunk.iloc[offset::num_shards]
+            if chunk.empty:
+                continue
+            features = vectorizer.transform(chunk['text'].astype(str))
+            labels = (chunk['label'] == 'spam').astype(int).values
+            for i in range(features.shape[0]):
+                yield {
+                    'input_ids': torch.FloatTensor(features[i].toarray()[0]),
+                    'labels': int(labels[i])
+                }
+
+    def __iter__(self):
+        worker_info = get_worker_info()
+        worker_id = worker_info.id if worker_info else 0
+        num_workers = worker_info.num_workers if worker_info else 1
+        shard = self.rank * num_workers + worker_id
+        num_shards = self.world_size * num_workers
+
+        rng = random.Random(self.seed + self.epoch * num_shards + shard)
+        samples = self._iter_samples(shard, num_shards)
+        if self.shuffle_buffer_size <= 1:
+            yield from samples
+            return
+
+        # Shuffle buffer: emit a random buffered sample for every new one read
+        buffer = []
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(sample)
+                continue
+            i = rng.randrange(len(buffer))
+            yield buffer[i]
+            buffer[i] = sample
+        rng.shuffle(buffer)
+        yield from buffer
+
 class DataProcessor:
     def __init__(self):
         self.vectorizer = TfidfVectorizer(
@@ -60,6 +131,19 @@ class DataProcessor:
             logger.error(f"Error preprocessing text: {str(e)}")
             raise
             
+    def hashing_vectorizer(self, n_features: int = 768) -> HashingVectorizer:
+        """
+        Create a stateless vectorizer that hashes preprocessed text into a fixed
+        number of features, for data that cannot be fitted in memory.
+        """
+        return HashingVectorizer(
+            n_features=n_features,
+            preprocessor=self.preprocess_text,
+            stop_words='english',
+            ngram_range=(1, 2),
+            alternate_sign=False
+        )
+
     def load_data(self, file_path: str) -> pd.DataFrame:
         """
         Load data from a file and return as a DataFrame.
@@ -88,39 +172,77 @@ class DataProcessor:
             logger.error(f"Error preparing data: {str(e)}")
             raise
 
-    def create_dataloaders(self, train_df, val_df, test_df):
+    def split_data(self, df: pd.DataFrame, val_size: float = 0.1, test_size: float = 0.1,
+                   seed: int = 0) -> tuple:
+        """
+        Split a labelled DataFrame into stratified train, validation and test sets.
+        """
+        train_df, test_df = train_test_split(
+            df, test_size=test_size, stratify=df['label'], random_state=seed
+        )
+        train_df, val_df = train_test_split(
+            train_df, test_size=val_size / (1 - test_size), stratify=train_df['label'], random_state=seed
+        )
+        return train_df, val_df, test_df
+
+    def create_dataloaders(self, train_df, val_df, test_df, batch_size=32, n_features=768):
+        # Hash into the model's input space, as the streaming loader and the
+        # serving ModelStore do
+        vectorizer = self.hashing_vectorizer(n_features)
+
         # Create datasets
         train_dataset = SMSDataset(
-            texts=train_df['message'].values,
-            labels=train_df['label'].values,
-            vectorizer=self.vectorizer
+            texts=train_df['text'].values,
+            labels=(train_df['label'] == 'spam').astype(int).values,
+            vectorizer=vectorizer
         )
         val_dataset = SMSDataset(
-            texts=val_df['message'].values,
-            labels=val_df['label'].values,
-            vectorizer=self.vectorizer
+            texts=val_df['text'].values,
+            labels=(val_df['label'] == 'spam').astype(int).values,
+            vectorizer=vectorizer
         )
         test_dataset = SMSDataset(
-            texts=test_df['message'].values,
-            labels=test_df['label'].values,
-            vectorizer=self.vectorizer
+            texts=test_df['text'].values,
+            labels=(test_df['label'] == 'spam').astype(int).values,
+            vectorizer=vectorizer
         )
 
         # Create dataloaders
         train_loader = DataLoader(
             train_dataset,
-            batch_size=self.batch_size,
+            batch_size=batch_size,
             shuffle=True
         )
         val_loader = DataLoader(
             val_dataset,
-            batch_size=self.batch_size,
+            batch_size=batch_size,
             shuffle=False
         )
         test_loader = DataLoader(
             test_dataset,
-            batch_size=self.batch_size,
+            batch_size=batch_size,
             shuffle=False
         )
 
-        return train_loader, val_loader, test_loader 
\ No newline at end of file
+        return train_loader, val_loader, test_loader
+
+    def create_streaming_dataloader(self, file_path, batch_size=32, n_features=768, num_workers=0,
+                                    chunk_size=10000, shuffle_buffer_size=10000, seed=0,
+                                    rank=0, world_size=1):
+        """
+        Create a DataLoader that streams training data from a file too large to load into memory.
+        """
+        dataset = StreamingSMSDataset(
+            file_path,
+            n_features=n_features,
+            chunk_size=chunk_size,
+            shuffle_buffer_size=shuffle_buffer_size,
+            seed=seed,
+            rank=rank,
+            world_size=world_size
+        )
+        return DataLoader(
+            dataset,
+            batch_size=batch_size,
+            num_workers=num_workers
+        )
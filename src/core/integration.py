@@ -1,11 +1,18 @@
 import os
+import re
 import json
 import logging
 import aiohttp
 import asyncio
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+from src.utils import get_tier_config, SharedState
+from .preflight import CHARS_PER_TOKEN, estimate_tokens, preflight, cache_key_text
+from .payload import PayloadTemplates
+from .upstream import UpstreamPool
+from .results import ClassificationResult, parse_score
 
 # Configure logging
 logging.basicConfig(
@@ -18,27 +25,47 @@ class DeepSeekMCPError(Exception):
     """Base exception for DeepSeek MCP client errors."""
     pass
 
+PACKED_PROMPT_HEADER = (
+    "Classify each numbered message below as spam or ham. "
+    "Respond with only a JSON array containing exactly {count} objects, in the same order, "
+    "each of the form {{\"index\": <message number>, \"label\": \"spam\" or \"ham\", "
+    "\"score\": <spam probability between 0 and 1>}}.\n\n"
+)
+
 class DeepSeekMCPClient:
     """
     Client for interacting with the DeepSeek API using the MCP protocol.
     """
     
-    def __init__(self, api_key: str, tier: str = "free"):
+    def __init__(self, api_key: str, tier: str = "free", state: Optional[SharedState] = None,
+                 base_urls: Optional[List[Union[str, Dict[str, Any]]]] = None):
         """
         Initialize the DeepSeek MCP client.
         
         Args:
             api_key: The DeepSeek API key
             tier: The API access tier (free, basic, premium)
+            state: Shared state for usage counters aggregated across workers
+            base_urls: OpenAI-compatible upstream endpoints, as URLs or dicts with
+                url, api_key and max_concurrency keys (default: the DeepSeek API)
         """
         self.api_key = api_key
         self.tier = tier
-        self.base_url = "https://api.deepseek.com/v1"
+        self.pool = UpstreamPool.from_config(base_urls or ["https://api.deepseek.com/v1"])
+        self.base_url = self.pool.endpoints[0].url
         self.session = None
+        self.templates = PayloadTemplates()
         self.cache = {}
         self.cache_ttl = 3600  # 1 hour
         self.max_retries = 3
         self.retry_delay = 1  # seconds
+        self.pack_token_budget = 2000  # prompt tokens per packed request
+        self.pack_answer_tokens = 24  # completion tokens reserved per packed item
+        self.state = state or SharedState()
+        self.prefilter = None
+        self.model_store = None
+        self.calibrations: Dict[int, Dict[str, Any]] = {}
+        self._missing_thresholds = set()
         
     async def __aenter__(self):
         """Create aiohttp session when entering context."""
@@ -64,124 +91,503 @@ class DeepSeekMCPClient:
         self.tier = tier
         logger.info(f"API tier set to: {tier}")
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def process_text(self, text: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _resolve_tier(self, tier: Optional[str]) -> str:
+        """
+        Validate a per-call tier, defaulting to the client's tier.
+        
+        Callers sharing one client pass their tier explicitly instead of
+        calling set_tier, which would change it under concurrent calls.
+        """
+        tier = tier or self.tier
+        if tier not in ["free", "basic", "premium"]:
+            raise ValueError("Tier must be one of: free, basic, premium")
+        return tier
+        
+    def set_prefilter(self, prefilter):
+        """
+        Enable the rule prefilter stage.
+        
+        Texts matching a prefilter rule are decided by the rule, before the
+        local model cascade and without any upstream call.
+        
+        Args:
+            prefilter: A Prefilter, or any object with a match(text) method
+                returning a result dict or None
+        """
+        self.prefilter = prefilter
+        
+    def set_cascade(self, model_store, calibration: Dict[str, Any]):
+        """
+        Enable the local-model cascade.
+        
+        Texts the local model classifies with calibrated confidence are answered
+        locally, and only texts in the uncertain band are sent upstream. The band
+        for each tier is looked up by the tier's cascade_precision.
+        
+        A calibration only applies to the model version it was fitted on. While
+        the store serves any other version, for example after a hot swap, every
+        text is escalated; call this again to register a calibration for the
+        new version.
+        
+        Args:
+            model_store: A ModelStore serving the local model
+            calibration: Calibration output of train.calibrate_model
+        """
+        version = int(calibration.get("model_version", 0))
+        self.model_store = model_store
+        self.calibrations[version] = calibration
+        logger.info(f"Cascade enabled for model version {version} "
+                    f"with temperature {calibration['temperature']:.3f}")
+        
+    def _preflight(self, texts: List[str], tier: str) -> List[str]:
+        """
+        Normalize texts and enforce the tier's input token budget.
+        """
+        max_input_tokens = get_tier_config()[tier]["max_input_tokens"]
+        prepared = []
+        truncated_count = 0
+        for text in texts:
+            text, truncated = preflight(text, max_input_tokens)
+            prepared.append(text)
+            truncated_count += truncated
+        if truncated_count:
+            self.state.increment("truncated_inputs", truncated_count)
+            logger.info(f"{truncated_count} input(s) truncated to fit the tier token budget")
+        return prepared
+        
+    def _decide_locally(self, texts: List[str], tier: str) -> List[Optional[ClassificationResult]]:
+        """
+        Run the local stages: the rule prefilter, then the model cascade on
+        texts no rule matched.
+        
+        Returns:
+            A local result for each decided text, and None for texts that
+            should be escalated upstream
+        """
+        start_time = time.perf_counter()
+        if self.prefilter is None:
+            return self._cascade(texts, tier, start_time)
+        
+        matches = [self.prefilter.match(text) for text in texts]
+        latency = time.perf_counter() - start_time
+        results = [
+            None if match is None else ClassificationResult(
+                match["label"], match["score"], reason=f"prefilter:{match['rule']}", latency=latency
+            )
+            for match in matches
+        ]
+        undecided = [i for i, result in enumerate(results) if result is None]
+        self.state.increment("prefilter_checked", len(texts))
+        if len(undecided) < len(texts):
+            self.state.increment("prefilter_matched", len(texts) - len(undecided))
+            for match in matches:
+                if match is not None:
+                    self.state.increment(f"prefilter_hit:{match['rule']}")
+        for i, result in zip(undecided, self._cascade([texts[i] for i in undecided], tier, start_time)):
+            results[i] = result
+        return results
+        
+    def _cascade(self, texts: List[str], tier: str,
+                 start_time: Optional[float] = None) -> List[Optional[ClassificationResult]]:
+        """
+        Classify texts with the local model.
+        
+        Args:
+            texts: Texts to classify
+            tier: The API access tier, which selects the precision target
+            start_time: perf_counter() at the start of the local stages, for
+                the result latency
+            
+        Returns:
+            A local result for each confidently classified text, and None for
+            texts that should be escalated upstream
+        """
+        if self.model_store is None or not texts:
+            return [None] * len(texts)
+        if start_time is None:
+            start_time = time.perf_counter()
+        # Take one snapshot so the model and its calibration cannot diverge
+        version, model = self.model_store.current()
+        calibration = self.calibrations.get(version)
+        precision = get_tier_config()[tier]["cascade_precision"]
+        thresholds = calibration["thresholds"].get(str(precision)) if calibration else None
+        if thresholds is None:
+            # E.g. calibrated with custom --target-precisions
+            if calibration is not None and (version, precision) not in self._missing_thresholds:
+                self._missing_thresholds.add((version, precision))
+                logger.warning(f"Calibration of model version {version} has no thresholds for "
+                               f"precision {precision}, escalating all {tier} tier texts")
+            self.state.increment("cascade_escalated", len(texts))
+            self.state.increment("cascade_uncalibrated", len(texts))
+            return [None] * len(texts)
+        
+        _, probs = self.model_store.predict_proba(texts, model=model, temperature=calibration["temperature"])
+        latency = time.perf_counter() - start_time
+        results = []
+        tokens_saved = 0
+        for text, prob in zip(texts, probs):
+            if prob >= thresholds["spam_threshold"] or prob <= thresholds["ham_threshold"]:
+                tokens_saved += estimate_tokens(text)
+                results.append(ClassificationResult(
+                    "spam" if prob >= thresholds["spam_threshold"] else "ham",
+                    float(prob),
+                    reason="cascade",
+                    model_version=version,
+                    latency=latency
+                ))
+            else:
+                results.append(None)
+        
+        escalated = results.count(None)
+        self.state.increment("cascade_escalated", escalated)
+        self.state.increment("cascade_local", len(texts) - escalated)
+        self.state.increment("cascade_tokens_saved", tokens_saved)
+        return results
+        
+    def _get_cached(self, cache_key: Tuple[str, str, str]) -> Optional[ClassificationResult]:
+        """Get an unexpired cached result; entries are (timestamp, ClassificationResult) pairs."""
+        entry = self.cache.get(cache_key)
+        if entry is None or time.time() - entry[0] >= self.cache_ttl:
+            return None
+        self.state.increment("cache_hits")
+        return entry[1]
+        
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10),
+           retry=retry_if_not_exception_type(ValueError))
+    async def process_text(self, text: str, options: Optional[Dict[str, Any]] = None,
+                           local_first: bool = True, raw: bool = False, classify: bool = True,
+                           tier: Optional[str] = None) -> Dict[str, Any]:
         """
         Process text using the DeepSeek API with retry mechanism.
         
         Args:
             text: The text to process
             options: Additional options for processing
+            local_first: Answer from the prefilter or local model cascade when they decide
+            raw: Return the raw upstream response instead of the compact result.
+                Raw responses bypass the cache.
+            classify: Send the classification system prompt. Requests that carry
+                their own instructions, like packed prompts, turn it off and
+                bypass the cache.
+            tier: The API access tier for this call (default: the client's tier)
             
         Returns:
-            Dict containing the processing results
+            The compact result (see ClassificationResult.to_dict), or the raw
+            upstream response if raw is set and the text was sent upstream
             
         Raises:
             DeepSeekMCPError: If the API request fails after retries
+            ValueError: If the tier or an option is not allowed or invalid for the tier
         """
+        # Fail fast on an invalid tier or options; they are not worth retrying
+        tier = self._resolve_tier(tier)
+        options_key = self.templates.options_key(tier, options)
+        
         if not self.session:
             self.session = aiohttp.ClientSession(
                 headers={"Authorization": f"Bearer {self.api_key}"}
             )
             
+        # Normalize and enforce the tier's input token budget
+        text = self._preflight([text], tier)[0]
+
+        # Skip the upstream call when a prefilter rule or the local model decides
+        if local_first:
+            local_result = self._decide_locally([text], tier)[0]
+            if local_result is not None:
+                return local_result.to_dict()
+
         # Check cache
-        cache_key = f"{text}:{json.dumps(options or {})}"
-        if cache_key in self.cache:
-            cache_entry = self.cache[cache_key]
-            if (datetime.now() - cache_entry["timestamp"]).total_seconds() < self.cache_ttl:
+        cache_key = (tier, options_key, cache_key_text(text))
+        cacheable = classify and not raw
+        if cacheable:
+            cached_result = self._get_cached(cache_key)
+            if cached_result is not None:
                 logger.info("Using cached result")
-                return cache_entry["result"]
+                return cached_result.to_dict()
                 
-        # Prepare request
-        url = f"{self.base_url}/chat/completions"
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [{"role": "user", "content": text}],
-            "tier": self.tier
-        }
-        
-        if options:
-            payload.update(options)
+        # Prepare request from the prebuilt tier template
+        body = self.templates.render(tier, options_key, text, classify)
+        # With several upstreams a failed attempt fails over to another
+        # endpoint right away instead of backing off
+        failover = len(self.pool) > 1
+        delay = 0
             
         # Make request with retry
         for attempt in range(self.max_retries):
+            # Back off outside the endpoint's concurrency slot
+            if delay:
+                await asyncio.sleep(delay)
+                delay = 0
+            endpoint = await self.pool.acquire()
+            headers = {"Content-Type": "application/json"}
+            if endpoint.headers:
+                headers.update(endpoint.headers)
+            start_time = time.perf_counter()
+            ok = False
             try:
-                async with self.session.post(url, json=payload) as response:
+                async with self.session.post(endpoint.chat_url, data=body, headers=headers) as response:
                     if response.status == 429:  # Rate limit
                         retry_after = int(response.headers.get('Retry-After', self.retry_delay))
-                        logger.warning(f"Rate limited. Waiting {retry_after} seconds.")
-                        await asyncio.sleep(retry_after)
+                        logger.warning(f"Rate limited by {endpoint.url}. Waiting {retry_after} seconds.")
+                        delay = 0 if failover else retry_after
+                        continue
+                        
+                    if response.status >= 500 and failover:
+                        logger.warning(f"Upstream {endpoint.url} returned {response.status}, failing over")
                         continue
                         
                     if response.status != 200:
+                        # Client errors are not the endpoint's fault
+                        ok = response.status < 500
                         error_text = await response.text()
                         logger.error(f"API error: {error_text}")
                         raise DeepSeekMCPError(f"API error: {response.status} - {error_text}")
                         
-                    result = await response.json()
+                    response_data = await response.json()
+                    ok = True
+                    latency = time.perf_counter() - start_time
+                    self.state.increment("upstream_calls")
+                    self.state.increment("upstream_latency", latency)
+                    if raw:
+                        return response_data
                     
-                    # Cache result
-                    self.cache[cache_key] = {
-                        "result": result,
-                        "timestamp": datetime.now()
-                    }
+                    # Parse once and cache only the compact result; answers
+                    # that did not parse are not worth keeping
+                    result = ClassificationResult.from_response(response_data, latency)
+                    if cacheable and result.label is not None:
+                        self.cache[cache_key] = (time.time(), result)
                     
-                    return result
+                    return result.to_dict()
                     
             except aiohttp.ClientError as e:
-                logger.error(f"Network error: {str(e)}")
+                logger.error(f"Network error from {endpoint.url}: {str(e)}")
                 if attempt == self.max_retries - 1:
                     raise DeepSeekMCPError(f"Network error after {self.max_retries} attempts: {str(e)}")
-                await asyncio.sleep(self.retry_delay * (attempt + 1))
+                delay = 0 if failover else self.retry_delay * (attempt + 1)
                 
             except Exception as e:
                 logger.error(f"Error processing text: {str(e)}")
                 raise DeepSeekMCPError(f"Error processing text: {str(e)}")
                 
-    async def batch_process(self, texts: List[str], options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+            finally:
+                await self.pool.release(endpoint, time.perf_counter() - start_time, ok)
+                
+        raise DeepSeekMCPError(f"No upstream succeeded after {self.max_retries} attempts")
+                
+    def _build_packs(self, texts: List[str], token_budget: int, tier: Optional[str] = None) -> List[List[int]]:
+        """
+        Group text indices into packs that fit the prompt token budget and the
+        tier's max_tokens for the JSON answer.
+        """
+        tier_config = get_tier_config()[tier or self.tier]
+        max_tokens = tier_config["max_tokens"]
+        # Packs are sized by their rendered lines, so the prompt passes the
+        # tier's input budget in process_text without being truncated
+        budget_chars = min(token_budget, tier_config["max_input_tokens"]) * CHARS_PER_TOKEN
+        max_items = max(1, max_tokens // self.pack_answer_tokens)
+        header_chars = len(PACKED_PROMPT_HEADER.format(count=max_items))
+
+        packs = []
+        current = []
+        current_chars = header_chars
+        for i, text in enumerate(texts):
+            item_chars = len(self._packed_line(max_items, text)) + 1
+            if current and (current_chars + item_chars > budget_chars or len(current) >= max_items):
+                packs.append(current)
+                current = []
+                current_chars = header_chars
+            current.append(i)
+            current_chars += item_chars
+        if current:
+            packs.append(current)
+        return packs
+
+    def _packed_line(self, number: int, text: str) -> str:
+        return f"{number}. {json.dumps(text, ensure_ascii=False)}"
+
+    def _build_packed_prompt(self, texts: List[str]) -> str:
+        lines = [self._packed_line(n, text) for n, text in enumerate(texts, start=1)]
+        return PACKED_PROMPT_HEADER.format(count=len(texts)) + "\n".join(lines)
+
+    def _parse_packed_response(self, response: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+        """
+        Parse the JSON-array answer of a packed request back into per-item results.
+
+        Raises:
+            ValueError: If the answer is not a JSON array with one entry per item
+        """
+        try:
+            content = response["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError("Packed response has no message content")
+
+        match = re.search(r"\[.*\]", content, re.DOTALL)
+        if not match:
+            raise ValueError("Packed response does not contain a JSON array")
+        items = json.loads(match.group(0))
+
+        if not isinstance(items, list) or len(items) != count:
+            raise ValueError(f"Packed response has {len(items)} items, expected {count}")
+        if not all(isinstance(item, dict) and item.get("label") in ("spam", "ham") for item in items):
+            raise ValueError("Packed response items must have a spam or ham label")
+        if [item.get("index") for item in items] != list(range(1, count + 1)):
+            raise ValueError("Packed response items are out of order")
+        return items
+
+    async def _process_pack(self, texts: List[str], options: Optional[Dict[str, Any]], tier: str) -> List[Any]:
+        """
+        Process a pack of texts with a single upstream request, falling back to
+        per-item requests if the packed answer cannot be parsed. Parsed items
+        are cached per text, like single-text results.
+        """
+        if len(texts) > 1:
+            try:
+                prompt = self._build_packed_prompt(texts)
+                if len(prompt) > get_tier_config()[tier]["max_input_tokens"] * CHARS_PER_TOKEN:
+                    # Truncation would cut out numbered items the answer must cover
+                    raise ValueError("Packed prompt exceeds the tier's input token budget")
+                start_time = time.perf_counter()
+                response = await self.process_text(prompt, options, local_first=False, raw=True,
+                                                   classify=False, tier=tier)
+                items = self._parse_packed_response(response, len(texts))
+                latency = time.perf_counter() - start_time
+                options_key = self.templates.options_key(tier, options)
+                results = []
+                for text, item in zip(texts, items):
+                    result = ClassificationResult(item["label"], parse_score(item.get("score")),
+                                                  reason="packed", model_version=response.get("model"),
+                                                  latency=latency)
+                    self.cache[(tier, options_key, cache_key_text(text))] = (time.time(), result)
+                    results.append(result.to_dict())
+                return results
+            except Exception as e:
+                logger.warning(f"Packed request failed, falling back to per-item requests: {str(e)}")
+
+        tasks = [self.process_text(text, options, local_first=False, tier=tier) for text in texts]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def batch_process(self, texts: List[str], options: Optional[Dict[str, Any]] = None,
+                            pack: bool = False, pack_token_budget: Optional[int] = None,
+                            raw: bool = False, tier: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Process multiple texts in parallel with error handling.
         
         Args:
             texts: List of texts to process
             options: Additional options for processing
+            pack: Pack several short texts into a single upstream request
+            pack_token_budget: Prompt token budget per packed request
+            raw: Return raw upstream responses and echo each text. Packed
+                items have no per-item response and stay compact.
+            tier: The API access tier for this batch (default: the client's tier)
             
         Returns:
-            List of processing results
+            List of processing results, in the order of texts
         """
-        tasks = [self.process_text(text, options) for text in texts]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Reject an invalid tier or options once for the whole batch
+        tier = self._resolve_tier(tier)
+        options_key = self.templates.options_key(tier, options)
+        
+        # Pre-flight once, so the local stages see the same bounded, normalized
+        # text as process_text and the upstream or packed calls reuse it
+        prepared = self._preflight(texts, tier)
+        
+        # Answer texts decided by prefilter rules or confidently by the local model
+        results = [result if result is None else result.to_dict() for result in self._decide_locally(prepared, tier)]
+        escalated = [i for i, result in enumerate(results) if result is None]
+        
+        if pack:
+            # Answer cached texts first and pack only the rest, keeping the
+            # combined prompt of the pre-flighted texts within budget
+            for i in escalated:
+                cached_result = self._get_cached((tier, options_key, cache_key_text(prepared[i])))
+                if cached_result is not None:
+                    results[i] = cached_result.to_dict()
+            escalated = [i for i in escalated if results[i] is None]
+            packed_texts = [prepared[i] for i in escalated]
+            packs = self._build_packs(packed_texts, pack_token_budget or self.pack_token_budget, tier)
+            pack_results = await asyncio.gather(
+                *(self._process_pack([packed_texts[i] for i in indices], options, tier) for indices in packs)
+            )
+            for indices, group in zip(packs, pack_results):
+                for i, result in zip(indices, group):
+                    results[escalated[i]] = result
+        else:
+            tasks = [self.process_text(prepared[i], options, local_first=False, raw=raw, tier=tier)
+                     for i in escalated]
+            for i, result in zip(escalated, await asyncio.gather(*tasks, return_exceptions=True)):
+                results[i] = result
         
         # Process results and handle errors
         processed_results = []
         for i, result in enumerate(results):
             if isinstance(result, Exception):
                 logger.error(f"Error processing text {i}: {str(result)}")
-                processed_results.append({
-                    "error": str(result),
-                    "text": texts[i],
-                    "status": "error"
-                })
+                item = {"error": str(result), "status": "error"}
             else:
-                processed_results.append({
-                    "result": result,
-                    "text": texts[i],
-                    "status": "success"
-                })
+                item = {"result": result, "status": "success"}
+            if raw:
+                item["text"] = texts[i]
+            processed_results.append(item)
                 
         return processed_results
         
+    def _cascade_usage(self, counters: Dict[str, float]) -> Dict[str, Any]:
+        local = int(counters.get("cascade_local", 0))
+        escalated = int(counters.get("cascade_escalated", 0))
+        upstream_calls = counters.get("upstream_calls", 0)
+        avg_latency = counters.get("upstream_latency", 0.0) / upstream_calls if upstream_calls else 0.0
+        return {
+            "enabled": self.model_store is not None,
+            "calibrated_versions": sorted(self.calibrations),
+            "serving_version": self.model_store.version if self.model_store is not None else None,
+            "uncalibrated": int(counters.get("cascade_uncalibrated", 0)),
+            "local": local,
+            "escalated": escalated,
+            "escalation_rate": escalated / (local + escalated) if local + escalated else 0.0,
+            "avg_upstream_latency": avg_latency,
+            "estimated_latency_saved": avg_latency * local,
+            "estimated_tokens_saved": int(counters.get("cascade_tokens_saved", 0))
+        }
+        
+    def _prefilter_usage(self, counters: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        if self.prefilter is None:
+            return None
+        checked = int(counters.get("prefilter_checked", 0))
+        matched = int(counters.get("prefilter_matched", 0))
+        hits = {name.split(":", 1)[1]: int(value) for name, value in counters.items()
+                if name.startswith("prefilter_hit:")}
+        return {
+            "rules": self.prefilter.rule_count,
+            "checked": checked,
+            "matched": matched,
+            "match_rate": matched / checked if checked else 0.0,
+            "hits": dict(sorted(hits.items(), key=lambda item: -item[1]))
+        }
+        
     def get_usage_stats(self) -> Dict[str, Any]:
         """
         Get API usage statistics.
         
+        Counters are aggregated over all workers sharing the client's state;
+        the cache is per worker.
+        
         Returns:
             Dict containing usage statistics
         """
+        counters = self.state.get_counters()
         return {
             "tier": self.tier,
+            "workers": self.state.worker_count(),
             "cache_size": len(self.cache),
+            "truncated_inputs": int(counters.get("truncated_inputs", 0)),
+            "upstream_calls": int(counters.get("upstream_calls", 0)),
+            "cached_responses": int(counters.get("cache_hits", 0)),
+            "cascade": self._cascade_usage(counters),
+            "prefilter": self._prefilter_usage(counters),
+            "upstreams": self.pool.get_stats(),
             "timestamp": datetime.now().isoformat(),
-            "cache_hits": sum(1 for entry in self.cache.values() 
-                            if (datetime.now() - entry["timestamp"]).total_seconds() < self.cache_ttl)
+            "cache_hits": sum(1 for timestamp, _ in self.cache.values()
+                            if time.time() - timestamp < self.cache_ttl)
         } 
\ No newline at end of file
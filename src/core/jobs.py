@@ -0,0 +1,254 @@
+import os
+import json
+import uuid
+import fcntl
+import asyncio
+import logging
+from itertools import islice
+from typing import Dict, List, Optional, Any, Iterator
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class JobNotFoundError(Exception):
+    """Raised when a job ID does not exist in the job store."""
+    pass
+
+class JobManager:
+    """
+    Asynchronous job queue for very large batch submissions.
+
+    Each job lives in its own directory under ``jobs_dir``:
+
+    - ``state.json``: status and progress, rewritten atomically after every chunk
+    - ``input.jsonl``: the submitted texts, one JSON string per line
+    - ``chunk_NNNNN.json``: processed results for one chunk of ``chunk_size`` texts
+
+    Jobs are processed chunk by chunk with at most ``max_workers`` concurrent
+    ``process_text`` calls, so a restart resumes from the last completed chunk.
+    """
+
+    def __init__(self, client, jobs_dir: str = "jobs", max_workers: int = 8,
+                 chunk_size: int = 500):
+        """
+        Initialize the job manager.
+
+        Args:
+            client: A DeepSeekMCPClient used to process each text
+            jobs_dir: Directory where job state and results are persisted
+            max_workers: Maximum number of concurrent upstream calls
+            chunk_size: Number of texts processed and persisted per chunk
+        """
+        self.client = client
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    def _job_dir(self, job_id: str) -> str:
+        # Job IDs are generated hex strings; reject anything that could escape jobs_dir
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            raise JobNotFoundError(f"Job not found: {job_id}")
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _write_json(self, path: str, data: Any):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _save_state(self, state: Dict[str, Any]):
+        state["updated_at"] = datetime.now().isoformat()
+        self._write_json(os.path.join(self._job_dir(state["job_id"]), "state.json"), state)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get the persisted state of a job.
+
+        Raises:
+            JobNotFoundError: If the job does not exist
+        """
+        path = os.path.join(self._job_dir(job_id), "state.json")
+        if not os.path.exists(path):
+            raise JobNotFoundError(f"Job not found: {job_id}")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_results(self, job_id: str, chunk: int = 0) -> Dict[str, Any]:
+        """
+        Get one page (chunk) of results for a job.
+
+        Args:
+            job_id: The job ID
+            chunk: Zero-based chunk index
+
+        Returns:
+            Dict with the chunk results and paging information
+
+        Raises:
+            JobNotFoundError: If the job does not exist
+            ValueError: If the chunk is out of range or not yet processed
+        """
+        state = self.get_job(job_id)
+        if chunk < 0 or chunk >= state["total_chunks"]:
+            raise ValueError(f"Chunk must be between 0 and {state['total_chunks'] - 1}")
+        if chunk >= state["completed_chunks"]:
+            raise ValueError(f"Chunk {chunk} has not been processed yet")
+
+        with open(os.path.join(self._job_dir(job_id), f"chunk_{chunk:05d}.json"), encoding="utf-8") as f:
+            results = json.load(f)
+
+        next_chunk = chunk + 1 if chunk + 1 < state["total_chunks"] else None
+        return {
+            "job_id": job_id,
+            "chunk": chunk,
+            "total_chunks": state["total_chunks"],
+            "next_chunk": next_chunk,
+            "results": results
+        }
+
+    async def submit(self, texts: List[str], tier: str = "free",
+                     options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Persist a new job and enqueue it for background processing.
+
+        Returns:
+            The job ID
+        """
+        if not texts:
+            raise ValueError("Job must contain at least one text")
+
+        job_id = uuid.uuid4().hex
+        # Creates jobs_dir on the first submission
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+
+        with open(os.path.join(job_dir, "input.jsonl"), "w", encoding="utf-8") as f:
+            for text in texts:
+                f.write(json.dumps(text) + "\n")
+
+        state = {
+            "job_id": job_id,
+            "status": "queued",
+            "tier": tier,
+            "options": options,
+            "total": len(texts),
+            "processed": 0,
+            "failed": 0,
+            "chunk_size": self.chunk_size,
+            "total_chunks": (len(texts) + self.chunk_size - 1) // self.chunk_size,
+            "completed_chunks": 0,
+            "created_at": datetime.now().isoformat(),
+            "error": None
+        }
+        self._save_state(state)
+
+        await self._ensure_started()
+        await self.queue.put(job_id)
+        logger.info(f"Job {job_id} queued with {len(texts)} texts")
+        return job_id
+
+    async def start(self):
+        """Start the background runner and resume any unfinished jobs."""
+        await self._ensure_started()
+        if not os.path.isdir(self.jobs_dir):
+            return
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            try:
+                state = self.get_job(job_id)
+            except (JobNotFoundError, ValueError):
+                continue
+            if state["status"] in ("queued", "running"):
+                logger.info(f"Resuming job {job_id} at chunk {state['completed_chunks']}")
+                await self.queue.put(job_id)
+
+    async def stop(self):
+        """Cancel the background runner. Unfinished jobs resume on next start."""
+        if self._runner:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _ensure_started(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._process_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                state = self.get_job(job_id)
+                state["status"] = "failed"
+                state["error"] = str(e)
+                self._save_state(state)
+            finally:
+                self.queue.task_done()
+
+    def _iter_chunks(self, job_id: str, start_chunk: int, chunk_size: int) -> Iterator[List[str]]:
+        with open(os.path.join(self._job_dir(job_id), "input.jsonl"), encoding="utf-8") as f:
+            lines = (json.loads(line) for line in f)
+            for _ in islice(lines, start_chunk * chunk_size):
+                pass
+            while True:
+                chunk = list(islice(lines, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+
+    async def _process_job(self, job_id: str):
+        # With several API workers sharing jobs_dir, only the worker holding the
+        # job's lock processes it; the lock is released if that worker dies
+        with open(os.path.join(self._job_dir(job_id), "lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info(f"Job {job_id} is being processed by another worker")
+                return
+            await self._process_locked_job(job_id)
+
+    async def _process_locked_job(self, job_id: str):
+        state = self.get_job(job_id)
+        if state["status"] in ("completed", "failed"):
+            return
+
+        state["status"] = "running"
+        self._save_state(state)
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def process_one(text: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.client.process_text(text, state["options"], tier=state["tier"])
+                    return {"result": result, "status": "success"}
+                except Exception as e:
+                    return {"error": str(e), "status": "error"}
+
+        chunk_index = state["completed_chunks"]
+        for texts in self._iter_chunks(job_id, chunk_index, state["chunk_size"]):
+            results = await asyncio.gather(*(process_one(text) for text in texts))
+
+            self._write_json(
+                os.path.join(self._job_dir(job_id), f"chunk_{chunk_index:05d}.json"),
+                results
+            )
+            chunk_index += 1
+            state["completed_chunks"] = chunk_index
+            state["processed"] += len(results)
+            state["failed"] += sum(1 for r in results if r["status"] == "error")
+            self._save_state(state)
+
+        state["status"] = "completed"
+        self._save_state(state)
+        logger.info(f"Job {job_id} completed: {state['processed']} processed, {state['failed']} failed")
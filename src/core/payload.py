@@ -0,0 +1,131 @@
+import json
+from typing import Dict, Optional, Any, Tuple
+from src.utils import get_tier_config
+
+# Request options callers may set, with their accepted types
+ALLOWED_OPTIONS = {
+    "temperature": (int, float),
+    "top_p": (int, float),
+    "max_tokens": (int,),
+    "presence_penalty": (int, float),
+    "frequency_penalty": (int, float),
+    "stop": (str, list),
+    "seed": (int,),
+}
+
+# System prompt for single-text requests; the answer is parsed by
+# ClassificationResult.from_response
+CLASSIFY_PROMPT = (
+    "You are an SMS spam classifier. Classify the user's message as spam or ham. "
+    "Respond with only a JSON object of the form "
+    "{\"label\": \"spam\" or \"ham\", \"score\": <spam probability between 0 and 1>}."
+)
+
+class PayloadTemplates:
+    """
+    Prebuilt chat-completion request bodies for each tier.
+
+    The JSON body for a (tier, options, classify) combination is serialized
+    once and split around the user message content, so rendering a request
+    only has to encode the text itself and concatenate bytes. Classification
+    requests start with the CLASSIFY_PROMPT system message; requests that
+    carry their own instructions, like packed prompts, leave it out.
+    """
+
+    def __init__(self, model: str = "deepseek-chat", max_templates: int = 256,
+                 system_prompt: str = CLASSIFY_PROMPT):
+        """
+        Initialize the templates.
+
+        Args:
+            model: Upstream model name
+            max_templates: Maximum number of cached (tier, options, classify) templates
+            system_prompt: System message for classification requests
+        """
+        self.model = model
+        self.max_templates = max_templates
+        self.system_prompt = system_prompt
+        self.tier_config = get_tier_config()
+        self._templates: Dict[Tuple[str, tuple, bool], Tuple[bytes, bytes]] = {}
+        for tier in self.tier_config:
+            for classify in (True, False):
+                self._templates[(tier, (), classify)] = self._compile(tier, (), classify)
+
+    def options_key(self, tier: str, options: Optional[Dict[str, Any]]) -> tuple:
+        """
+        Validate options against the allowlist and the tier limits.
+
+        Returns:
+            A hashable, order-independent key for the options
+
+        Raises:
+            ValueError: If an option is unknown or invalid for the tier
+        """
+        if not options:
+            return ()
+
+        for name, value in options.items():
+            allowed_types = ALLOWED_OPTIONS.get(name)
+            if allowed_types is None:
+                raise ValueError(f"Unsupported option: {name}")
+            if isinstance(value, bool) or not isinstance(value, allowed_types):
+                raise ValueError(f"Invalid type for option {name}")
+
+        max_tokens = options.get("max_tokens")
+        if max_tokens is not None and not 0 < max_tokens <= self.tier_config[tier]["max_tokens"]:
+            raise ValueError(f"max_tokens must be between 1 and {self.tier_config[tier]['max_tokens']} "
+                             f"for the {tier} tier")
+        if not 0 <= options.get("temperature", 0) <= 2:
+            raise ValueError("temperature must be between 0 and 2")
+        if not 0 < options.get("top_p", 1) <= 1:
+            raise ValueError("top_p must be between 0 and 1")
+        stop = options.get("stop")
+        if isinstance(stop, list) and not all(isinstance(item, str) for item in stop):
+            raise ValueError("stop must be a string or a list of strings")
+
+        return tuple(sorted(
+            (name, tuple(value) if isinstance(value, list) else value)
+            for name, value in options.items()
+        ))
+
+    def _compile(self, tier: str, options_key: tuple, classify: bool) -> Tuple[bytes, bytes]:
+        config = self.tier_config[tier]
+        body = {
+            "model": self.model,
+            "tier": tier,
+            "max_tokens": config["max_tokens"],
+            "temperature": config["temperature"],
+        }
+        body.update(options_key)
+        # messages goes last so the body can be split around its content
+        body["messages"] = None
+        serialized = json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+        messages = '['
+        if classify:
+            system = json.dumps(self.system_prompt, ensure_ascii=False)
+            messages += f'{{"role":"system","content":{system}}},'
+        prefix = serialized[:-len("null}")] + messages + '{"role":"user","content":'
+        return prefix.encode("utf-8"), b"}]}"
+
+    def render(self, tier: str, options_key: tuple, text: str, classify: bool = True) -> bytes:
+        """
+        Render the JSON request body for a text.
+
+        Args:
+            tier: The API access tier
+            options_key: Key returned by options_key()
+            text: The message content
+            classify: Start with the classification system prompt
+
+        Returns:
+            The serialized request body
+        """
+        key = (tier, options_key, classify)
+        template = self._templates.get(key)
+        if template is None:
+            if len(self._templates) >= self.max_templates:
+                # Keep the per-tier defaults, drop option-specific templates
+                self._templates = {key: value for key, value in self._templates.items() if not key[1]}
+            template = self._templates[key] = self._compile(tier, options_key, classify)
+        prefix, suffix = template
+        return prefix + json.dumps(text, ensure_ascii=False).encode("utf-8") + suffix
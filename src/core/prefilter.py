@@ -0,0 +1,227 @@
+import os
+import re
+import json
+import logging
+import threading
+import ahocorasick
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PrefilterError(Exception):
+    """Raised when a rules file cannot be loaded."""
+    pass
+
+def load_rules(path: str) -> List[Dict[str, Any]]:
+    """
+    Load prefilter rules from a JSON lines file.
+
+    Each line is an object with an "id", a "pattern", a "label" (spam or ham)
+    and an optional "regex" flag. Patterns are literal strings unless "regex"
+    is true. Blank lines and lines starting with # are ignored.
+
+    Raises:
+        PrefilterError: If a rule is malformed
+    """
+    rules = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                rule = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise PrefilterError(f"{path}:{line_number}: invalid JSON: {str(e)}")
+            if not rule.get("id") or not rule.get("pattern") or rule.get("label") not in ("spam", "ham"):
+                raise PrefilterError(f"{path}:{line_number}: rule needs an id, a pattern and a spam or ham label")
+            rules.append(rule)
+    return rules
+
+class RuleMatcher:
+    """
+    Compiled prefilter rules.
+
+    Literal rules go into an Aho-Corasick automaton, so matching them takes
+    one linear pass over the text however many rules there are. The few regex
+    rules are combined into a separate alternation. Matching is done on the
+    lowercased text, so both kinds are case-insensitive.
+    """
+
+    def __init__(self, automaton: Optional["ahocorasick.Automaton"], max_literal_length: int,
+                 pattern: Optional[re.Pattern], rules_by_group: Dict[int, Tuple[int, Dict[str, Any]]],
+                 rule_count: int):
+        self.automaton = automaton
+        self.max_literal_length = max_literal_length
+        self.pattern = pattern
+        self.rules_by_group = rules_by_group
+        self.rule_count = rule_count
+
+    def search(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the leftmost matching rule, preferring the earlier rule in the file
+        when several match at the same position.
+        """
+        folded = text.lower()
+        best = None  # (start, rule order, rule)
+
+        if self.automaton is not None:
+            # Matches are reported by end position; once a match cannot start
+            # before the best one found so far, no later match can either
+            for end, (order, length, rule) in self.automaton.iter(folded):
+                if best is not None and end - self.max_literal_length >= best[0]:
+                    break
+                start = end - length + 1
+                if best is None or (start, order) < best[:2]:
+                    best = (start, order, rule)
+
+        if self.pattern is not None:
+            match = self.pattern.search(folded)
+            if match:
+                order, rule = self.rules_by_group[match.lastindex]
+                if best is None or (match.start(), order) < best[:2]:
+                    best = (match.start(), order, rule)
+
+        return best[2] if best else None
+
+def compile_rules(rules: List[Dict[str, Any]]) -> RuleMatcher:
+    """
+    Compile rules into a literal automaton and a regex alternation.
+
+    Each regex rule is wrapped in its own capturing group, so Match.lastindex
+    identifies the matching rule.
+
+    Raises:
+        PrefilterError: If a pattern does not compile
+    """
+    automaton = ahocorasick.Automaton()
+    max_literal_length = 0
+    parts = []
+    rules_by_group = {}
+    group = 1
+    for order, rule in enumerate(rules):
+        if not rule.get("regex"):
+            literal = rule["pattern"].lower()
+            # Keep the first of duplicate literals so file order decides
+            if literal not in automaton:
+                automaton.add_word(literal, (order, len(literal), rule))
+                max_literal_length = max(max_literal_length, len(literal))
+            continue
+
+        pattern = rule["pattern"]
+        try:
+            inner_groups = re.compile(pattern).groups
+        except re.error as e:
+            raise PrefilterError(f"Rule {rule['id']}: invalid pattern: {str(e)}")
+        parts.append(f"({pattern})")
+        rules_by_group[group] = (order, rule)
+        group += 1 + inner_groups
+
+    try:
+        compiled = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+    except re.error as e:
+        raise PrefilterError(f"Rules do not combine into one pattern: {str(e)}")
+
+    if len(automaton):
+        automaton.make_automaton()
+    else:
+        automaton = None
+    return RuleMatcher(automaton, max_literal_length, compiled, rules_by_group, len(rules))
+
+class Prefilter:
+    """
+    Decides texts that match known spam or ham rules without calling any model.
+
+    Literal rules are matched with an Aho-Corasick automaton and regex rules
+    with one combined regular expression (see RuleMatcher). Once start() is
+    called, a background thread re-reads the rules file when its modification
+    time changes and swaps in the compiled matcher atomically, so requests
+    never wait on a stat or a recompile. Hit counters are kept by the client in its shared
+    state, so they are aggregated over all workers.
+    """
+
+    def __init__(self, rules_path: str, check_interval: float = 5.0):
+        """
+        Initialize the prefilter.
+
+        Args:
+            rules_path: Path to the JSON lines rules file
+            check_interval: Seconds between checks for a modified rules file
+        """
+        self.rules_path = rules_path
+        self.check_interval = check_interval
+        self._mtime = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._matcher = compile_rules([])
+        self.reload()
+
+    @property
+    def rule_count(self) -> int:
+        return self._matcher.rule_count
+
+    def reload(self) -> bool:
+        """
+        Recompile the rules file if it changed. On error the previous rules stay active.
+
+        Returns:
+            True if new rules were loaded
+        """
+        with self._reload_lock:
+            try:
+                mtime = os.stat(self.rules_path).st_mtime_ns
+            except OSError as e:
+                logger.error(f"Cannot read prefilter rules: {str(e)}")
+                return False
+            if mtime == self._mtime:
+                return False
+
+            try:
+                self._matcher = compile_rules(load_rules(self.rules_path))
+            except (OSError, PrefilterError) as e:
+                logger.error(f"Keeping previous prefilter rules: {str(e)}")
+                return False
+            self._mtime = mtime
+            logger.info(f"Loaded {self.rule_count} prefilter rules from {self.rules_path}")
+            return True
+
+    def start(self):
+        """Start watching the rules file on a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prefilter-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Error reloading prefilter rules: {str(e)}")
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Match a text against the rules.
+
+        Returns:
+            A result for the leftmost matching rule, or None if no rule matched
+        """
+        rule = self._matcher.search(text)
+        if rule is None:
+            return None
+
+        return {
+            "label": rule["label"],
+            "score": 1.0 if rule["label"] == "spam" else 0.0,
+            "source": "prefilter",
+            "rule": rule["id"]
+        }
@@ -0,0 +1,70 @@
+import unicodedata
+from typing import Tuple
+
+# Marker inserted where the middle of an over-long text was dropped
+TRUNCATION_MARKER = " [...] "
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the number of tokens in a text (roughly 4 characters per token).
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize unicode compatibility forms, collapse whitespace runs within each
+    line into single spaces and drop blank lines.
+    """
+    lines = (" ".join(line.split()) for line in unicodedata.normalize("NFKC", text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+def cache_key_text(text: str) -> str:
+    """
+    Get the case-insensitive form of an already normalized text used for cache keys.
+    """
+    return text.casefold()
+
+def truncate_text(text: str, max_tokens: int, head_fraction: float = 0.75) -> Tuple[str, bool]:
+    """
+    Truncate a text to fit a token budget, keeping its head and tail segments.
+
+    Args:
+        text: The text to truncate
+        max_tokens: The token budget
+        head_fraction: Share of the budget given to the head segment
+
+    Returns:
+        Tuple of (text, truncated)
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+
+    budget = max(0, max_chars - len(TRUNCATION_MARKER))
+    head_chars = int(budget * head_fraction)
+    tail_chars = budget - head_chars
+    tail = text[len(text) - tail_chars:] if tail_chars else ""
+    return text[:head_chars] + TRUNCATION_MARKER + tail, True
+
+def preflight(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """
+    Prepare a text for an upstream call: normalize it and enforce the token budget.
+
+    Over-long inputs are cut down to head and tail segments before normalization
+    so that multi-megabyte texts cost time proportional to the budget, not the input.
+
+    Args:
+        text: The raw input text
+        max_tokens: The input token budget
+
+    Returns:
+        Tuple of (normalized text, truncated)
+    """
+    # Keep a margin so that whitespace collapsed by normalization does not
+    # shorten the text below what the budget would have allowed
+    text, truncated = truncate_text(text, max_tokens * 2)
+    text, cut = truncate_text(normalize_text(text), max_tokens)
+    return text, truncated or cut
@@ -0,0 +1,96 @@
+import re
+import json
+from typing import Dict, Optional, Any, Union
+
+OBJECT_PATTERN = re.compile(r"\{.*?\}", re.DOTALL)
+
+def parse_score(value: Any) -> Optional[float]:
+    """Get a spam score from a parsed JSON value, or None if it is not a number."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+class ClassificationResult:
+    """
+    Compact classification result.
+
+    Upstream responses are parsed once into this record, and only the record
+    is cached, instead of the full chat-completion response.
+
+    Reason codes:
+
+    - ``upstream``: parsed from an upstream response
+    - ``unparsed``: the upstream response had no JSON spam or ham label
+    - ``packed``: parsed from a packed multi-text upstream response
+    - ``cascade``: decided with calibrated confidence by the local model
+    - ``prefilter:<rule id>``: decided by a prefilter rule
+    """
+
+    __slots__ = ("label", "score", "reason", "model_version", "latency")
+
+    def __init__(self, label: Optional[str], score: Optional[float] = None, reason: str = "upstream",
+                 model_version: Optional[Union[int, str]] = None, latency: float = 0.0):
+        """
+        Initialize the result.
+
+        Args:
+            label: spam, ham, or None if the label could not be determined
+            score: Spam probability, if known
+            reason: Reason code, see the class docstring
+            model_version: Local model version or upstream model name
+            latency: Seconds spent producing the result
+        """
+        self.label = label
+        self.score = score
+        self.reason = reason
+        self.model_version = model_version
+        self.latency = latency
+
+    @classmethod
+    def from_response(cls, response: Dict[str, Any], latency: float = 0.0) -> "ClassificationResult":
+        """
+        Parse a chat-completion response.
+
+        The request asks for a JSON object with a label and a score (see
+        payload.CLASSIFY_PROMPT). The first JSON object in the message content
+        is read, which tolerates code fences around it; anything else is
+        marked unparsed rather than guessed from the wording.
+        """
+        try:
+            content = response["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            content = ""
+        model_version = response.get("model") if isinstance(response, dict) else None
+
+        match = OBJECT_PATTERN.search(content)
+        if match:
+            try:
+                item = json.loads(match.group(0))
+            except ValueError:
+                item = None
+            if isinstance(item, dict) and str(item.get("label", "")).lower() in ("spam", "ham"):
+                return cls(
+                    item["label"].lower(),
+                    parse_score(item.get("score")),
+                    model_version=model_version,
+                    latency=latency
+                )
+        return cls(None, reason="unparsed", model_version=model_version, latency=latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "score": self.score,
+            "reason": self.reason,
+            "model_version": self.model_version,
+            "latency": self.latency
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ClassificationResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"ClassificationResult(label={self.label!r}, score={self.score!r}, reason={self.reason!r}, "
+                f"model_version={self.model_version!r}, latency={self.latency!r})")
@@ -0,0 +1,428 @@
+import os
+import re
+import logging
+import tempfile
+import threading
+import numpy as np
+import torch
+from typing import List, Optional, Tuple
+from .data_processor import DataProcessor
+from .train import SimpleClassifier
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATTERN = re.compile(r"^model_v(\d+)\.pt$")
+
+def checkpoint_name(version: int) -> str:
+    """Get the file name of a versioned model checkpoint."""
+    return f"model_v{version:06d}.pt"
+
+def save_checkpoint(model: torch.nn.Module, checkpoint_dir: str, version: int) -> str:
+    """
+    Atomically write a versioned checkpoint into a directory.
+
+    The state dict is written to a hidden temporary file first and then renamed,
+    so readers never observe a partially written checkpoint.
+
+    Returns:
+        The checkpoint path
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, checkpoint_name(version))
+    tmp_path = os.path.join(checkpoint_dir, f".{checkpoint_name(version)}.tmp")
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def save_new_checkpoint(model: torch.nn.Module, checkpoint_dir: str, min_version: int = 1) -> Tuple[int, str]:
+    """
+    Write a checkpoint under the next free version number.
+
+    The state dict is written to a private temporary file, which is then
+    hard-linked to the versioned name. Linking fails if the name already exists,
+    so two processes allocating a version at the same time never write the
+    same one; the loser retries with the next number.
+
+    Args:
+        model: Model to save
+        checkpoint_dir: Directory where versioned checkpoints are written
+        min_version: Lowest version number to allocate
+
+    Returns:
+        Tuple of (version, checkpoint path)
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".model_", suffix=".tmp", dir=checkpoint_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save(model.state_dict(), f)
+        version = max(min_version, latest_checkpoint_version(checkpoint_dir) + 1)
+        while True:
+            path = os.path.join(checkpoint_dir, checkpoint_name(version))
+            try:
+                os.link(tmp_path, path)
+                return version, path
+            except FileExistsError:
+                version += 1
+    finally:
+        os.unlink(tmp_path)
+
+def checkpoint_versions(checkpoint_dir: str) -> List[int]:
+    """Get the checkpoint versions in a directory, in ascending order."""
+    if not os.path.isdir(checkpoint_dir):
+        return []
+    return sorted(int(m.group(1)) for m in map(CHECKPOINT_PATTERN.match, os.listdir(checkpoint_dir)) if m)
+
+def latest_checkpoint_version(checkpoint_dir: str) -> int:
+    """Get the highest checkpoint version in a directory, or 0 if there is none."""
+    return max(checkpoint_versions(checkpoint_dir), default=0)
+
+def load_checkpoint(path: str) -> SimpleClassifier:
+    """
+    Load a state dict checkpoint into a SimpleClassifier.
+
+    Weights are memory-mapped and assigned directly to the model parameters, so
+    every worker process that loads the same file shares its pages read-only
+    through the OS page cache instead of holding a private copy. Both need
+    torch 2.1 or later.
+    """
+    state_dict = torch.load(path, map_location='cpu', mmap=True, weights_only=True)
+    hidden_size, input_size = state_dict['fc1.weight'].shape
+    model = SimpleClassifier(
+        input_size=input_size,
+        hidden_size=hidden_size,
+        num_classes=state_dict['fc2.weight'].shape[0]
+    )
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    return model
+
+def load_holdout(file_path: str, sample_size: int = 500, seed: int = 0) -> Tuple[List[str], List[int]]:
+    """
+    Load a labelled holdout sample from a file in SMSSpamCollection format.
+
+    Returns:
+        Tuple of (texts, labels) with 1 for spam and 0 for ham
+    """
+    df = DataProcessor().load_data(file_path)
+    df = df.sample(n=min(sample_size, len(df)), random_state=seed)
+    return df['text'].astype(str).tolist(), (df['label'] == 'spam').astype(int).tolist()
+
+class ModelStore:
+    """
+    Holds the serving model behind an atomically swappable reference.
+
+    The current model and its version are kept in a single tuple attribute, so
+    a request that took a snapshot keeps using the same model even if a new
+    version is swapped in while it is running.
+    """
+
+    def __init__(self, model: torch.nn.Module, version: int = 0, vectorizer=None):
+        """
+        Initialize the model store.
+
+        Args:
+            model: The initial serving model
+            version: Version number of the initial model
+            vectorizer: Optional fitted vectorizer with a frozen vocabulary. If not
+                given, texts are hashed into the model's input feature space.
+        """
+        self.n_features = model.fc1.in_features
+        self.processor = DataProcessor()
+        self.vectorizer = vectorizer or self.processor.hashing_vectorizer(self.n_features)
+        self._hashed = vectorizer is None
+        model.eval()
+        self._current: Tuple[int, torch.nn.Module] = (version, model)
+
+    @classmethod
+    def from_checkpoint(cls, path: Optional[str], version: int = 0, vectorizer=None) -> "ModelStore":
+        """
+        Create a store from a state dict checkpoint, or from a fresh model if the
+        path does not exist.
+        """
+        if path and os.path.exists(path):
+            model = load_checkpoint(path)
+        else:
+            logger.warning(f"Model checkpoint not found at {path}, serving an untrained model")
+            model = SimpleClassifier()
+        return cls(model, version=version, vectorizer=vectorizer)
+
+    def current(self) -> Tuple[int, torch.nn.Module]:
+        """Get a consistent (version, model) snapshot."""
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current[0]
+
+    def swap(self, model: torch.nn.Module, version: int):
+        """Atomically replace the serving model."""
+        model.eval()
+        self._current = (version, model)
+        logger.info(f"Serving model swapped to version {version}")
+
+    def featurize(self, texts: List[str]) -> torch.Tensor:
+        """Convert texts into model input features."""
+        if self._hashed:
+            features = self.vectorizer.transform(texts).toarray()
+        else:
+            processed = [self.processor.preprocess_text(text) for text in texts]
+            features = self.vectorizer.transform(processed).toarray()[:, :self.n_features]
+            features = np.pad(features, ((0, 0), (0, self.n_features - features.shape[1])))
+        return torch.FloatTensor(features)
+
+    def predict_proba(self, texts: List[str], model: Optional[torch.nn.Module] = None,
+                      temperature: float = 1.0) -> Tuple[int, np.ndarray]:
+        """
+        Get spam probabilities for texts.
+
+        Args:
+            texts: Texts to classify
+            model: Model to use instead of the current serving model
+            temperature: Calibrated softmax temperature of the model
+
+        Returns:
+            Tuple of (model version, spam probabilities)
+        """
+        version, current = self.current()
+        if model is None:
+            model = current
+        with torch.no_grad():
+            logits = model(self.featurize(texts))
+        return version, torch.softmax(logits / temperature, dim=1)[:, 1].numpy()
+
+class ModelWatcher:
+    """
+    Watches a model directory and hot-swaps new checkpoint versions into a ModelStore.
+
+    New versions are loaded on a background thread and validated on a holdout
+    sample before the swap. Versions that fail validation are skipped in favour
+    of the newest earlier version that passes; call check() once at startup to
+    serve the newest valid checkpoint. Models produced in this process, such as
+    OnlineLearner updates, go through the same validation with accepts().
+    """
+
+    def __init__(self, store: ModelStore, model_dir: str, holdout_texts: List[str],
+                 holdout_labels: List[int], min_accuracy: float = 0.9, poll_interval: float = 5.0):
+        """
+        Initialize the model watcher.
+
+        Args:
+            store: The ModelStore to update
+            model_dir: Directory containing versioned checkpoints
+            holdout_texts: Texts used to validate new versions
+            holdout_labels: Labels of the holdout texts, 1 for spam and 0 for ham
+            min_accuracy: Minimum holdout accuracy for a new version to be served
+            poll_interval: Seconds between directory scans
+        """
+        self.store = store
+        self.model_dir = model_dir
+        self.holdout_texts = holdout_texts
+        self.holdout_labels = np.array(holdout_labels)
+        self.min_accuracy = min_accuracy
+        self.poll_interval = poll_interval
+        self.rejected_versions = set()
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def validate(self, model: torch.nn.Module) -> float:
+        """Get the holdout accuracy of a model."""
+        if not self.holdout_texts:
+            return 1.0
+        _, probs = self.store.predict_proba(self.holdout_texts, model=model)
+        return float(((probs >= 0.5).astype(int) == self.holdout_labels).mean())
+
+    def accepts(self, model: torch.nn.Module, version: Optional[int] = None) -> bool:
+        """
+        Check whether a model reaches the minimum holdout accuracy.
+
+        Args:
+            model: Candidate model
+            version: Checkpoint version of the candidate, recorded if rejected
+
+        Returns:
+            True if the model may be served
+        """
+        accuracy = self.validate(model)
+        if accuracy >= self.min_accuracy:
+            return True
+        name = f"model version {version}" if version is not None else "model update"
+        logger.warning(f"Rejected {name}: holdout accuracy {accuracy:.4f} below {self.min_accuracy:.4f}")
+        if version is not None:
+            self.rejected_versions.add(version)
+        return False
+
+    def swap(self, model: torch.nn.Module, version: int) -> bool:
+        """
+        Swap in an accepted model if it is newer than the serving model.
+
+        Returns:
+            True if the model was swapped in
+        """
+        with self._swap_lock:
+            if version <= self.store.version:
+                return False
+            self.store.swap(model, version)
+        return True
+
+    def offer(self, model: torch.nn.Module, version: int) -> bool:
+        """
+        Validate a model and swap it in if it passes and is newer than the
+        serving model.
+
+        Args:
+            model: Candidate model
+            version: Checkpoint version of the candidate
+
+        Returns:
+            True if the model was swapped in
+        """
+        return self.accepts(model, version) and self.swap(model, version)
+
+    def check(self) -> bool:
+        """
+        Swap in the newest checkpoint that is newer than the serving model and
+        passes validation. Rejected versions are remembered and skipped, so a
+        failed version falls back to the newest earlier one that passes.
+
+        Returns:
+            True if a new version was swapped in
+        """
+        for version in reversed(checkpoint_versions(self.model_dir)):
+            if version <= self.store.version:
+                return False
+            if version in self.rejected_versions:
+                continue
+            model = load_checkpoint(os.path.join(self.model_dir, checkpoint_name(version)))
+            if self.offer(model, version):
+                return True
+        return False
+
+    def start(self):
+        """Start watching on a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error reloading model: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+class OnlineLearner:
+    """
+    Applies mini-batch SGD updates to the serving model from labelled feedback.
+
+    Updates train a copy of the current model and validate it on the
+    ModelWatcher's holdout. Only an accepted update is written as a new
+    versioned checkpoint and swapped into the ModelStore, so serving never
+    waits on training.
+    """
+
+    def __init__(self, store: ModelStore, checkpoint_dir: str = "models",
+                 batch_size: int = 32, learning_rate: float = 1e-2, epochs: int = 1,
+                 watcher: Optional[ModelWatcher] = None):
+        """
+        Initialize the online learner.
+
+        Args:
+            store: The ModelStore holding the serving model
+            checkpoint_dir: Directory where versioned checkpoints are written
+            batch_size: Number of labelled messages per SGD step
+            learning_rate: SGD learning rate
+            epochs: Passes over each batch of feedback
+            watcher: ModelWatcher that validates and swaps in updated models. If
+                not given, updates are swapped in without validation.
+        """
+        self.store = store
+        self.watcher = watcher
+        self.checkpoint_dir = checkpoint_dir
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.pending: List[Tuple[str, int]] = []
+        self._buffer_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    def add_feedback(self, texts: List[str], labels: List[int]) -> int:
+        """
+        Buffer labelled messages for the next update.
+
+        Args:
+            texts: Message texts
+            labels: Labels, 1 for spam and 0 for ham
+
+        Returns:
+            Number of messages waiting for an update
+        """
+        if len(texts) != len(labels):
+            raise ValueError("texts and labels must have the same length")
+        if any(label not in (0, 1) for label in labels):
+            raise ValueError("labels must be 0 (ham) or 1 (spam)")
+        with self._buffer_lock:
+            self.pending.extend(zip(texts, labels))
+            return len(self.pending)
+
+    def update(self) -> Optional[int]:
+        """
+        Train on all buffered feedback and swap in the updated model.
+
+        Returns:
+            The new model version, or None if there was no feedback to apply or
+            the updated model failed validation
+        """
+        with self._update_lock:
+            with self._buffer_lock:
+                samples, self.pending = self.pending, []
+            if not samples:
+                return None
+
+            version, serving_model = self.store.current()
+            model = SimpleClassifier(
+                input_size=serving_model.fc1.in_features,
+                hidden_size=serving_model.fc1.out_features,
+                num_classes=serving_model.fc2.out_features
+            )
+            model.load_state_dict(serving_model.state_dict())
+            model.train()
+
+            optimizer = torch.optim.SGD(model.parameters(), lr=self.learning_rate)
+            criterion = torch.nn.CrossEntropyLoss()
+
+            texts = [text for text, _ in samples]
+            features = self.store.featurize(texts)
+            labels = torch.LongTensor([label for _, label in samples])
+
+            for _ in range(self.epochs):
+                order = torch.randperm(len(samples))
+                for start in range(0, len(samples), self.batch_size):
+                    batch = order[start:start + self.batch_size]
+                    optimizer.zero_grad()
+                    loss = criterion(model(features[batch]), labels[batch])
+                    loss.backward()
+                    optimizer.step()
+
+            # Validate before the checkpoint gets a versioned name, so a rejected
+            # update is never picked up by a watcher or a restarting worker
+            if self.watcher is not None and not self.watcher.accepts(model):
+                return None
+            new_version, _ = save_new_checkpoint(model, self.checkpoint_dir, min_version=version + 1)
+            if self.watcher is not None:
+                self.watcher.swap(model, new_version)
+            else:
+                self.store.swap(model, new_version)
+            logger.info(f"Applied {len(samples)} feedback samples, model version {new_version}")
+            return new_version
@@ -1,11 +1,21 @@
 import torch
 import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
 from torch.optim import Adam
 from tqdm import tqdm
 import numpy as np
 from sklearn.metrics import classification_report
 import os
-from data_processor import DataProcessor
+import json
+import argparse
+from contextlib import nullcontext
+try:
+    from .data_processor import DataProcessor
+except ImportError:
+    # Allow running as a script from src/core
+    from data_processor import DataProcessor
 
 class SimpleClassifier(nn.Module):
     def __init__(self, input_size=768, hidden_size=256, num_classes=2):
@@ -22,8 +32,10 @@ class SimpleClassifier(nn.Module):
         x = self.fc2(x)
         return x
 
-def evaluate_model(model, val_loader, device):
+def evaluate_model(model, val_loader, device, report=True):
     model.eval()
+    correct = torch.zeros((), dtype=torch.long, device=device)
+    total = 0
     val_preds = []
     val_labels = []
     
@@ -35,57 +47,273 @@ def evaluate_model(model, val_loader, device):
             outputs = model(features)
             preds = torch.argmax(outputs, dim=1)
             
-            val_preds.extend(preds.cpu().numpy())
-            val_labels.extend(labels.cpu().numpy())
+            # Accumulate on device; only copy predictions out when a report is needed
+            correct += (preds == labels).sum()
+            total += labels.numel()
+            if report:
+                val_preds.append(preds.cpu())
+                val_labels.append(labels.cpu())
     
-    val_preds = np.array(val_preds)
-    val_labels = np.array(val_labels)
+    accuracy = correct.item() / max(total, 1)
+    if not report:
+        return accuracy, None
     
     # Calculate metrics
-    report = classification_report(val_labels, val_preds, target_names=['Ham', 'Spam'])
-    accuracy = (val_preds == val_labels).mean()
+    val_report = classification_report(
+        torch.cat(val_labels).numpy(), torch.cat(val_preds).numpy(),
+        labels=[0, 1], target_names=['Ham', 'Spam'], zero_division=0
+    )
     
-    return accuracy, report
+    return accuracy, val_report
 
-def train_model(model, train_loader, val_loader, device, num_epochs=3, learning_rate=1e-3):
+def train_model(model, train_loader, val_loader, device, num_epochs=3, learning_rate=1e-3,
+                best_model_path='best_model.pt', log_interval=50, report_every_epoch=False):
+    """
+    Train a model, optionally wrapped in DistributedDataParallel.
+
+    The running loss is accumulated on the device and only read back every
+    log_interval steps, and the full classification report is only computed
+    when report_every_epoch is set, so the training loop has no per-step host
+    syncs. With DistributedDataParallel, only the process given a
+    best_model_path evaluates and saves.
+    """
     optimizer = Adam(model.parameters(), lr=learning_rate)
     criterion = nn.CrossEntropyLoss()
+    distributed = isinstance(model, DistributedDataParallel)
+    module = model.module if distributed else model
     
     best_val_accuracy = 0
-    best_model_path = 'best_model.pt'
     
     for epoch in range(num_epochs):
         model.train()
-        total_loss = 0
-        progress_bar = tqdm(train_loader, desc=f'Epoch {epoch + 1}/{num_epochs}')
+        if hasattr(train_loader.dataset, 'set_epoch'):
+            train_loader.dataset.set_epoch(epoch)
+        total_loss = torch.zeros((), device=device)
+        steps = 0
+        progress_bar = tqdm(train_loader, desc=f'Epoch {epoch + 1}/{num_epochs}',
+                            disable=best_model_path is None)
         
-        for batch in progress_bar:
-            features = batch['input_ids'].to(device)
-            labels = batch['labels'].to(device)
-            
-            optimizer.zero_grad()
-            outputs = model(features)
-            loss = criterion(outputs, labels)
-            
-            loss.backward()
-            optimizer.step()
-            
-            total_loss += loss.item()
-            progress_bar.set_postfix({'loss': total_loss / (progress_bar.n + 1)})
+        # Ranks may receive uneven numbers of batches from a sharded stream
+        with model.join() if distributed else nullcontext():
+            for batch in progress_bar:
+                features = batch['input_ids'].to(device)
+                labels = batch['labels'].to(device)
+                
+                optimizer.zero_grad()
+                outputs = model(features)
+                loss = criterion(outputs, labels)
+                
+                loss.backward()
+                optimizer.step()
+                
+                total_loss += loss.detach()
+                steps += 1
+                if steps % log_interval == 0:
+                    progress_bar.set_postfix({'loss': total_loss.item() / steps})
+        
+        if distributed:
+            stats = torch.stack([total_loss, torch.tensor(float(steps), device=device)])
+            dist.all_reduce(stats)
+            total_loss, steps = stats[0], int(stats[1].item())
+        
+        if best_model_path is None:
+            continue
+        print(f'\nTraining Loss: {total_loss.item() / max(steps, 1):.4f}')
+        
+        if val_loader is None:
+            torch.save(module.state_dict(), best_model_path)
+            continue
         
         # Evaluate on validation set
-        val_accuracy, val_report = evaluate_model(model, val_loader, device)
-        print(f'\nValidation Accuracy: {val_accuracy:.4f}')
-        print('Validation Report:')
-        print(val_report)
+        val_accuracy, val_report = evaluate_model(module, val_loader, device, report=report_every_epoch)
+        print(f'Validation Accuracy: {val_accuracy:.4f}')
+        if val_report:
+            print('Validation Report:')
+            print(val_report)
         
         # Save best model
         if val_accuracy > best_val_accuracy:
             best_val_accuracy = val_accuracy
-            torch.save(model.state_dict(), best_model_path)
+            torch.save(module.state_dict(), best_model_path)
             print(f'New best model saved with validation accuracy: {val_accuracy:.4f}')
 
-def main():
+def collect_logits(model, data_loader, device):
+    """Collect model logits and labels over a data loader."""
+    model.eval()
+    all_logits = []
+    all_labels = []
+    with torch.no_grad():
+        for batch in data_loader:
+            all_logits.append(model(batch['input_ids'].to(device)).cpu())
+            all_labels.append(batch['labels'].cpu())
+    return torch.cat(all_logits), torch.cat(all_labels)
+
+def fit_temperature(logits, labels, max_iter=100):
+    """
+    Fit a temperature that minimizes the negative log-likelihood of
+    softmax(logits / temperature) on held-out data.
+    """
+    log_temperature = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_temperature], lr=0.1, max_iter=max_iter)
+    criterion = nn.CrossEntropyLoss()
+    
+    def closure():
+        optimizer.zero_grad()
+        loss = criterion(logits / log_temperature.exp(), labels)
+        loss.backward()
+        return loss
+    
+    optimizer.step(closure)
+    return float(log_temperature.exp().item())
+
+def compute_thresholds(probs, labels, target_precision):
+    """
+    Find confidence thresholds that reach a target precision on each side.
+
+    Texts with a spam probability at or above spam_threshold can be labelled
+    spam, and texts at or below ham_threshold can be labelled ham, each with at
+    least target_precision on the given data. Texts in between are uncertain.
+    A threshold outside [0, 1] means no text is confident enough for that label.
+    """
+    probs = np.asarray(probs, dtype=float)
+    labels = np.asarray(labels, dtype=int)
+    
+    def lowest_confident(scores, positives):
+        # Sort by descending score; precision of the top-k for every k
+        order = np.argsort(-scores, kind='stable')
+        sorted_scores = scores[order]
+        hits = np.cumsum(positives[order])
+        precision = hits / np.arange(1, len(order) + 1)
+        # A threshold includes all tied scores, so only cut after the last of a tie
+        cut = np.append(sorted_scores[1:] != sorted_scores[:-1], True)
+        confident = np.nonzero((precision >= target_precision) & cut)[0]
+        return sorted_scores[confident[-1]] if len(confident) else None
+    
+    spam = lowest_confident(probs, labels)
+    ham = lowest_confident(1 - probs, 1 - labels)
+    return {
+        'spam_threshold': float(spam) if spam is not None else 1.01,
+        'ham_threshold': float(1 - ham) if ham is not None else -0.01
+    }
+
+def calibrate_model(model, val_loader, device, target_precisions=(0.95, 0.99, 0.999), model_version=0):
+    """
+    Calibrate a trained model on the validation split with temperature scaling
+    and compute cascade thresholds for each target precision.
+
+    The calibration only holds for the weights it was fitted on, so it records
+    the serving version of the model; the cascade is disabled for any other
+    version.
+
+    Returns:
+        Dict with the model version, temperature and thresholds keyed by
+        target precision
+    """
+    logits, labels = collect_logits(model, val_loader, device)
+    temperature = fit_temperature(logits, labels)
+    probs = torch.softmax(logits / temperature, dim=1)[:, 1].numpy()
+    return {
+        'model_version': model_version,
+        'temperature': temperature,
+        'thresholds': {
+            str(target): compute_thresholds(probs, labels.numpy(), target)
+            for target in target_precisions
+        }
+    }
+
+def save_calibration(calibration, path):
+    """Write calibration results as JSON."""
+    with open(path, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    print(f'Calibration saved to {path} (temperature {calibration["temperature"]:.3f})')
+
+def _distributed_worker(rank, world_size, args):
+    os.environ.setdefault('MASTER_ADDR', '127.0.0.1')
+    os.environ.setdefault('MASTER_PORT', str(args.master_port))
+    torch.set_num_threads(args.threads)
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    try:
+        device = torch.device('cpu')
+        processor = DataProcessor()
+        train_loader = processor.create_streaming_dataloader(
+            args.data,
+            batch_size=args.batch_size,
+            num_workers=args.loader_workers,
+            rank=rank,
+            world_size=world_size
+        )
+        val_loader = None
+        if rank == 0 and args.val_data:
+            val_loader = processor.create_streaming_dataloader(
+                args.val_data, batch_size=args.batch_size, shuffle_buffer_size=0
+            )
+        
+        torch.manual_seed(args.seed)
+        model = DistributedDataParallel(SimpleClassifier())
+        train_model(
+            model, train_loader, val_loader, device,
+            num_epochs=args.epochs,
+            learning_rate=args.learning_rate,
+            best_model_path=args.output if rank == 0 else None
+        )
+        
+        if val_loader is not None:
+            model.module.load_state_dict(torch.load(args.output))
+            save_calibration(
+                calibrate_model(model.module, val_loader, device, args.target_precisions,
+                                args.model_version),
+                args.calibration_output
+            )
+    finally:
+        dist.destroy_process_group()
+
+def train_distributed(args):
+    """
+    Train on CPU with one DistributedDataParallel process (gloo backend) per worker,
+    each streaming its own shard of the training file.
+    """
+    if args.workers == 1:
+        # A single worker still goes through DDP so the code path is the same
+        _distributed_worker(0, 1, args)
+    else:
+        mp.spawn(_distributed_worker, args=(args.workers, args), nprocs=args.workers, join=True)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train the TextGuard spam classifier')
+    parser.add_argument('--data', default='SMSSpamCollection', help='Training data file')
+    parser.add_argument('--val-data', default=None, help='Validation data file (distributed mode)')
+    parser.add_argument('--output', default='best_model.pt', help='Where to save the best model')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--learning-rate', type=float, default=1e-3)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Number of data-parallel CPU training processes (0 for single-process mode)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Intra-op threads per training process (default: cpu_count // workers)')
+    parser.add_argument('--loader-workers', type=int, default=0, help='DataLoader workers per process')
+    parser.add_argument('--master-port', type=int, default=29500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--calibration-output', default='calibration.json',
+                        help='Where to save temperature and cascade thresholds')
+    parser.add_argument('--target-precisions', type=float, nargs='+', default=[0.95, 0.99, 0.999],
+                        help='Target precisions to compute cascade thresholds for')
+    parser.add_argument('--model-version', type=int, default=0,
+                        help='Serving version of the trained model, recorded with its calibration '
+                             '(0 for the fallback model, N for model_vNNNNNN.pt)')
+    args = parser.parse_args(argv)
+    if args.threads is None:
+        # Split the cores between the worker processes instead of oversubscribing them
+        args.threads = max(1, (os.cpu_count() or 1) // max(args.workers, 1))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers > 0:
+        train_distributed(args)
+        return
+    
+    torch.set_num_threads(args.threads)
+    
     # Set device
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     print(f'Using device: {device}')
@@ -95,21 +323,32 @@ def main():
     
     # Load and prepare data
     print('Loading data...')
-    df = processor.load_data('SMSSpamCollection')
-    train_df, val_df, test_df = processor.prepare_data(df)
-    train_loader, val_loader, test_loader = processor.create_dataloaders(train_df, val_df, test_df)
+    df = processor.load_data(args.data)
+    train_df, val_df, test_df = processor.split_data(df, seed=args.seed)
+    train_loader, val_loader, test_loader = processor.create_dataloaders(
+        train_df, val_df, test_df, batch_size=args.batch_size
+    )
     
     # Initialize model
     print('Initializing model...')
+    torch.manual_seed(args.seed)
     model = SimpleClassifier().to(device)
     
     # Train model
     print('Starting training...')
-    train_model(model, train_loader, val_loader, device)
+    train_model(model, train_loader, val_loader, device, num_epochs=args.epochs,
+                learning_rate=args.learning_rate, best_model_path=args.output)
+    
+    # Load best model and calibrate on validation set
+    print('\nCalibrating on validation set...')
+    model.load_state_dict(torch.load(args.output))
+    save_calibration(
+        calibrate_model(model, val_loader, device, args.target_precisions, args.model_version),
+        args.calibration_output
+    )
     
-    # Load best model and evaluate on test set
+    # Evaluate on test set
     print('\nEvaluating on test set...')
-    model.load_state_dict(torch.load('best_model.pt'))
     test_accuracy, test_report = evaluate_model(model, test_loader, device)
     print(f'Test Accuracy: {test_accuracy:.4f}')
     print('Test Report:')
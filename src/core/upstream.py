@@ -0,0 +1,200 @@
+import time
+import random
+import asyncio
+import logging
+import statistics
+from typing import Dict, List, Optional, Any, Union
+
+logger = logging.getLogger(__name__)
+
+class Endpoint:
+    """
+    An OpenAI-compatible upstream endpoint with live latency and error statistics.
+    """
+
+    def __init__(self, url: str, api_key: Optional[str] = None, max_concurrency: int = 64):
+        """
+        Initialize the endpoint.
+
+        Args:
+            url: Base URL, e.g. https://api.deepseek.com/v1
+            api_key: API key for this endpoint, if it differs from the client's
+            max_concurrency: Maximum number of in-flight requests
+        """
+        self.url = url.rstrip("/")
+        self.chat_url = f"{self.url}/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.requests = 0
+        self.failures = 0
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.max_concurrency
+
+    def cost(self, default_latency: float = 0.0) -> float:
+        """
+        Expected cost of sending the next request here: EWMA latency scaled by
+        queue depth and inflated by the recent error rate.
+
+        Args:
+            default_latency: Latency to assume while the endpoint has no sample
+        """
+        latency = self.latency_ewma if self.latency_ewma is not None else default_latency
+        return latency * (self.in_flight + 1) / max(1.0 - self.error_ewma, 0.05)
+
+    def get_stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "latency_ewma": self.latency_ewma,
+            "error_rate": self.error_ewma,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected": self.is_ejected(now),
+            "ejections": self.ejections
+        }
+
+class UpstreamPool:
+    """
+    Latency-aware load balancer over several OpenAI-compatible endpoints.
+
+    Each request picks two random available endpoints and uses the cheaper one
+    (power of two choices). Endpoints that fail failure_threshold times in a
+    row are ejected for ejection_time seconds, doubling on repeated ejections,
+    and are probed again once the ejection expires.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], ewma_alpha: float = 0.3,
+                 failure_threshold: int = 3, ejection_time: float = 30.0,
+                 max_ejection_time: float = 300.0, rng: Optional[random.Random] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints: Upstream endpoints
+            ewma_alpha: Weight of the newest sample in the latency and error EWMAs
+            failure_threshold: Consecutive failures before an endpoint is ejected
+            ejection_time: Seconds an endpoint is ejected for the first time
+            max_ejection_time: Upper bound for repeated ejections
+            rng: Random generator, for deterministic tests
+        """
+        if not endpoints:
+            raise ValueError("At least one upstream endpoint is required")
+        self.endpoints = endpoints
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self.rng = rng or random.Random()
+        self._capacity: Optional[asyncio.Condition] = None
+
+    @classmethod
+    def from_config(cls, endpoints: List[Union[str, Dict[str, Any]]], **kwargs) -> "UpstreamPool":
+        """
+        Create a pool from URLs or dicts with url, api_key and max_concurrency keys.
+        """
+        return cls([
+            Endpoint(endpoint) if isinstance(endpoint, str) else Endpoint(**endpoint)
+            for endpoint in endpoints
+        ], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def _pick(self) -> Optional[Endpoint]:
+        now = time.monotonic()
+        healthy = [e for e in self.endpoints if not e.is_ejected(now)]
+        if not healthy:
+            # Everything is ejected: route to the endpoint recovering soonest
+            # rather than failing all traffic
+            healthy = [min(self.endpoints, key=lambda e: e.ejected_until)]
+        available = [e for e in healthy if e.has_capacity()]
+        if not available:
+            return None
+        if len(available) == 1:
+            return available[0]
+        first, second = self.rng.sample(available, 2)
+        default_latency = 0.0
+        if first.latency_ewma is None or second.latency_ewma is None:
+            default_latency = self._median_latency()
+        return first if first.cost(default_latency) <= second.cost(default_latency) else second
+
+    def _median_latency(self) -> float:
+        """
+        Median EWMA latency of the endpoints with a sample, assumed for new and
+        recovered endpoints. With a cost of zero they would win every comparison
+        until their first response, so a recovering endpoint would receive a
+        whole burst of traffic at once.
+        """
+        samples = [e.latency_ewma for e in self.endpoints if e.latency_ewma is not None]
+        return statistics.median(samples) if samples else 0.0
+
+    async def acquire(self) -> Endpoint:
+        """
+        Pick an endpoint and reserve a concurrency slot on it, waiting for a slot
+        if every endpoint is at its limit.
+        """
+        if self._capacity is None:
+            self._capacity = asyncio.Condition()
+        async with self._capacity:
+            while True:
+                endpoint = self._pick()
+                if endpoint is not None:
+                    endpoint.in_flight += 1
+                    endpoint.requests += 1
+                    return endpoint
+                await self._capacity.wait()
+
+    async def release(self, endpoint: Endpoint, latency: float, ok: bool):
+        """
+        Release a slot and record the outcome of a request.
+
+        Args:
+            endpoint: The endpoint returned by acquire()
+            latency: Request latency in seconds
+            ok: Whether the request succeeded
+        """
+        alpha = self.ewma_alpha
+        endpoint.in_flight -= 1
+        if ok:
+            endpoint.error_ewma = (1 - alpha) * endpoint.error_ewma
+            endpoint.latency_ewma = latency if endpoint.latency_ewma is None else \
+                (1 - alpha) * endpoint.latency_ewma + alpha * latency
+            endpoint.consecutive_failures = 0
+            endpoint.ejections = 0
+        elif endpoint.is_ejected(time.monotonic()):
+            # A request that was already in flight when the endpoint was ejected:
+            # count it, but leave the statistics reset for the recovery probe
+            endpoint.failures += 1
+        else:
+            endpoint.error_ewma = (1 - alpha) * endpoint.error_ewma + alpha
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                duration = min(self.ejection_time * 2 ** endpoint.ejections, self.max_ejection_time)
+                endpoint.ejected_until = time.monotonic() + duration
+                endpoint.ejections += 1
+                endpoint.consecutive_failures = 0
+                # Start from a clean slate when the ejection expires; until its
+                # first new sample the endpoint is costed at the pool median
+                endpoint.latency_ewma = None
+                endpoint.error_ewma = 0.0
+                logger.warning(f"Ejected upstream {endpoint.url} for {duration:.0f} seconds")
+
+        async with self._capacity:
+            self._capacity.notify()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get per-endpoint statistics."""
+        now = time.monotonic()
+        return [endpoint.get_stats(now) for endpoint in self.endpoints]
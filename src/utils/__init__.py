@@ -1,4 +1,5 @@
 # Utils module initialization
-from .tier_config import get_tier_config
+from .tier_config import TierConfig, get_tier_config
+from .shared_state import SharedState
 
-__all__ = ['get_tier_config']
+__all__ = ['TierConfig', 'get_tier_config', 'SharedState']
@@ -0,0 +1,188 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import weakref
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Instances with counters that may still need flushing at interpreter exit
+_instances = weakref.WeakSet()
+
+def _flush_all():
+    for state in list(_instances):
+        try:
+            state.flush()
+        except sqlite3.Error:
+            pass
+
+atexit.register(_flush_all)
+
+class SharedState:
+    """
+    Process-shared counters and rate-limit buckets stored in SQLite.
+
+    Every uvicorn worker opens the same database file, so rate limits are
+    enforced across workers and statistics can be aggregated over all of them.
+    Counters are stored per worker (process ID) and summed on read. They are
+    aggregated in memory and written on a background thread every
+    flush_interval seconds, so increments on the request path never touch
+    SQLite; other workers' counters may lag by that interval. Rate-limit
+    buckets are read and written transactionally on every acquire. With the
+    default ":memory:" path the state is private to the process, which is
+    equivalent to the single-worker behaviour.
+    """
+
+    def __init__(self, path: str = ":memory:", timeout: float = 30.0, flush_interval: float = 1.0):
+        """
+        Initialize the shared state.
+
+        Args:
+            path: SQLite database file shared by all workers, or ":memory:"
+            timeout: Seconds to wait for another worker's write lock
+            flush_interval: Seconds between counter flushes to SQLite
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            "worker INTEGER NOT NULL, name TEXT NOT NULL, value REAL NOT NULL, "
+            "PRIMARY KEY (worker, name))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, count INTEGER NOT NULL, reset_time REAL NOT NULL)"
+        )
+        _instances.add(self)
+
+    @property
+    def worker_id(self) -> int:
+        return os.getpid()
+
+    def increment(self, name: str, amount: float = 1):
+        """Add to a counter of the current worker."""
+        if not amount:
+            return
+        with self._pending_lock:
+            self._pending[name] = self._pending.get(name, 0) + amount
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name="shared-state-flush", daemon=True)
+                self._flusher.start()
+
+    def flush(self):
+        """Write the counters aggregated since the last flush to SQLite."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO counters (worker, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (worker, name) DO UPDATE SET value = value + excluded.value",
+                    [(self.worker_id, name, value) for name, value in pending.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing counters: {str(e)}")
+
+    def get_counters(self) -> Dict[str, float]:
+        """Get all counters summed over workers."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT name, SUM(value) FROM counters GROUP BY name").fetchall()
+        return dict(rows)
+
+    def worker_count(self) -> int:
+        """Get the number of workers that have recorded counters."""
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT worker) FROM counters").fetchone()[0]
+
+    def reset_counters(self):
+        """Clear all counters, keeping rate-limit buckets."""
+        with self._pending_lock:
+            self._pending = {}
+        with self._lock:
+            self._conn.execute("DELETE FROM counters")
+
+    def acquire(self, key: str, limit: int, window: float, amount: int = 1) -> bool:
+        """
+        Atomically take requests from a fixed-window rate-limit bucket.
+
+        Args:
+            key: Bucket key
+            limit: Maximum requests per window
+            window: Window length in seconds
+            amount: Number of requests to take, all or none
+
+        Returns:
+            True if the requests are within the limit and were counted
+        """
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock so no other worker can
+            # read the same count between our check and update
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT count, reset_time FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now > row[1]:
+                    row = (0, now + window)
+                if row[0] + amount > limit:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, count, reset_time) VALUES (?, ?, ?)",
+                    (key, row[0] + amount, row[1])
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_bucket(self, key: str) -> Optional[Tuple[int, float]]:
+        """
+        Get the (count, reset_time) of a rate-limit bucket, or None if the bucket
+        does not exist or its window has expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count, reset_time FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() > row[1]:
+            return None
+        return row
+
+    def close(self):
+        """Flush pending counters and close the database."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        _instances.discard(self)
+        with self._lock:
+            self._conn.close()
@@ -1,15 +1,17 @@
 import os
 import time
+from functools import lru_cache
 from typing import Dict, Optional, Any
 from fastapi import HTTPException, Depends
 from fastapi.security import APIKeyHeader
 from dotenv import load_dotenv
 import logging
+from .shared_state import SharedState
 
 logger = logging.getLogger(__name__)
 
 class TierConfig:
-    def __init__(self):
+    def __init__(self, state: Optional[SharedState] = None):
         load_dotenv()
         self.api_key_header = APIKeyHeader(name="X-API-Key")
         
@@ -17,20 +19,23 @@ class TierConfig:
         self.tier_limits = {
             "free": {
                 "requests_per_day": 100,
-                "batch_size": 10
+                "batch_size": 10,
+                "job_size": 10000
             },
             "basic": {
                 "requests_per_day": 1000,
-                "batch_size": 50
+                "batch_size": 50,
+                "job_size": 100000
             },
             "premium": {
                 "requests_per_day": 10000,
-                "batch_size": 100
+                "batch_size": 100,
+                "job_size": 1000000
             }
         }
         
-        # Initialize request tracking
-        self.request_counts: Dict[str, Dict] = {}
+        # Request tracking lives in shared state so limits hold across workers
+        self.state = state or SharedState()
         
     async def verify_api_key(self, api_key: str = Depends(APIKeyHeader(name="X-API-Key"))) -> str:
         """
@@ -53,44 +58,47 @@ class TierConfig:
             
         return tier
         
+    def _bucket_key(self, tier: str) -> str:
+        return f"requests_per_day:{tier}"
+        
     def check_rate_limit(self, tier: str) -> bool:
         """
         Check if the request is within rate limits.
         """
-        current_time = time.time()
-        
-        # Initialize tracking for new API keys
-        if tier not in self.request_counts:
-            self.request_counts[tier] = {
-                "count": 0,
-                "reset_time": current_time + 86400  # 24 hours
-            }
-            
-        # Reset counter if 24 hours have passed
-        if current_time > self.request_counts[tier]["reset_time"]:
-            self.request_counts[tier] = {
-                "count": 0,
-                "reset_time": current_time + 86400
-            }
-            
-        # Check if under limit
-        if self.request_counts[tier]["count"] >= self.tier_limits[tier]["requests_per_day"]:
-            return False
-            
-        return True
+        bucket = self.state.get_bucket(self._bucket_key(tier))
+        current_count = bucket[0] if bucket else 0
+        return current_count < self.tier_limits[tier]["requests_per_day"]
         
     def release_request(self, tier: str):
         """
         Increment the request count for the tier.
         """
-        if tier in self.request_counts:
-            self.request_counts[tier]["count"] += 1
+        self.state.acquire(self._bucket_key(tier), limit=float("inf"), window=86400)
+        
+    def acquire(self, tier: str, amount: int = 1) -> bool:
+        """
+        Atomically check the rate limit and count the request.
+        
+        Args:
+            tier: The API access tier
+            amount: Number of requests to count, e.g. one per text of a job
+        
+        Returns:
+            True if the requests are within the tier's daily limit
+        """
+        return self.state.acquire(
+            self._bucket_key(tier),
+            limit=self.tier_limits[tier]["requests_per_day"],
+            window=86400,  # 24 hours
+            amount=amount
+        )
             
     def get_usage_stats(self, tier: str) -> Dict:
         """
         Get usage statistics for the tier.
         """
-        if tier not in self.request_counts:
+        bucket = self.state.get_bucket(self._bucket_key(tier))
+        if bucket is None:
             return {
                 "tier": tier,
                 "requests_today": 0,
@@ -98,35 +106,44 @@ class TierConfig:
                 "reset_time": time.time() + 86400
             }
             
-        current_count = self.request_counts[tier]["count"]
+        current_count, reset_time = bucket
         return {
             "tier": tier,
             "requests_today": current_count,
             "requests_remaining": self.tier_limits[tier]["requests_per_day"] - current_count,
-            "reset_time": self.request_counts[tier]["reset_time"]
+            "reset_time": reset_time
         }
 
+@lru_cache(maxsize=None)
 def get_tier_config() -> Dict[str, Dict[str, Any]]:
     """
     Get the configuration for different API tiers.
     
+    The configuration is built once and shared; callers must not modify it.
+    
     Returns:
         Dict containing tier configurations
     """
     return {
         "free": {
             "max_tokens": 1000,
+            "max_input_tokens": 1000,
             "temperature": 0.7,
+            "cascade_precision": 0.95,
             "features": ["basic_analysis"]
         },
         "basic": {
             "max_tokens": 2000,
+            "max_input_tokens": 4000,
             "temperature": 0.5,
+            "cascade_precision": 0.99,
             "features": ["basic_analysis", "sentiment_analysis", "entity_extraction"]
         },
         "premium": {
             "max_tokens": 4000,
+            "max_input_tokens": 16000,
             "temperature": 0.3,
+            "cascade_precision": 0.999,
             "features": ["basic_analysis", "sentiment_analysis", "entity_extraction", 
                         "language_detection", "content_moderation", "custom_models"]
         }
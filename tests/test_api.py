@@ -104,4 +104,77 @@ def test_get_stats(client):
     assert response.status_code == 200
     stats = response.json()
     assert "tier" in stats
-    assert "cache_size" in stats 
\ No newline at end of file
+    assert "cache_size" in stats 
+
+
+@patch("src.core.OnlineLearner.update")
+def test_feedback(mock_update, client):
+    """Test feedback submission."""
+    response = client.post(
+        "/feedback",
+        json={
+            "texts": ["Free entry now"],
+            "labels": ["spam"]
+        }
+    )
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+    assert response.json()["pending"] >= 1
+
+    response = client.post("/feedback", json={"texts": ["Hi"], "labels": ["maybe"]})
+    assert response.status_code == 400
+
+@patch("src.core.DeepSeekMCPClient.process_text")
+def test_analyze_rate_limited(mock_process, client):
+    """Test that requests over the daily tier limit are rejected."""
+    mock_process.return_value = {"result": "success"}
+
+    with patch("src.utils.TierConfig.acquire", return_value=False):
+        response = client.post("/analyze", json={"text": "Test text", "tier": "free"})
+
+    assert response.status_code == 429
+    assert not mock_process.called
+
+@patch("src.core.DeepSeekMCPClient.batch_process")
+@patch("src.core.DeepSeekMCPClient.process_text")
+def test_invalid_options_do_not_use_quota(mock_process, mock_batch_process, client):
+    """Test that requests rejected for their options are not counted."""
+    options = {"model": "x"}
+    with patch("src.utils.TierConfig.acquire", return_value=True) as mock_acquire:
+        response = client.post("/analyze", json={"text": "Test text", "tier": "free", "options": options})
+        assert response.status_code == 400
+
+        response = client.post("/batch", json={"texts": ["Test text"], "tier": "free", "options": options})
+        assert response.status_code == 400
+
+    assert not mock_acquire.called
+    assert not mock_process.called
+    assert not mock_batch_process.called
+
+@patch("src.api.main.job_manager.submit")
+def test_job_counts_against_rate_limit(mock_submit, client):
+    """Test that a job counts as one request against the daily tier limit."""
+    with patch("src.utils.TierConfig.acquire", return_value=False) as mock_acquire:
+        response = client.post("/jobs", json={"texts": ["a", "b", "c"], "tier": "free"})
+
+    assert response.status_code == 429
+    assert mock_acquire.call_args.args[-1] == "free"
+    assert not mock_submit.called
+
+    response = client.post("/jobs", json={"texts": ["a"], "tier": "gold"})
+    assert response.status_code == 400
+
+
+@patch("src.api.main.job_manager.submit")
+def test_job_is_validated_before_quota(mock_submit, client):
+    """Test that oversized jobs and invalid options are rejected without using quota."""
+    with patch("src.utils.TierConfig.acquire", return_value=True) as mock_acquire:
+        response = client.post("/jobs", json={"texts": ["a"] * 10001, "tier": "free"})
+        assert response.status_code == 400
+
+        response = client.post("/jobs", json={"texts": ["a"], "tier": "free", "options": {"model": "x"}})
+        assert response.status_code == 400
+
+    assert not mock_acquire.called
+    assert not mock_submit.called
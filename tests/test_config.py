@@ -1,2 +1,20 @@
+from src.utils import TierConfig, SharedState
+
 def test_api_base_url():
     assert True
+
+def test_tier_rate_limit():
+    """Test that the daily tier limit is enforced through shared state."""
+    config = TierConfig(SharedState())
+    config.tier_limits["free"]["requests_per_day"] = 2
+
+    assert config.check_rate_limit("free")
+    assert config.acquire("free")
+    config.release_request("free")
+    assert not config.check_rate_limit("free")
+    assert not config.acquire("free")
+
+    stats = config.get_usage_stats("free")
+    assert stats["requests_today"] == 2
+    assert stats["requests_remaining"] == 0
+    assert config.get_usage_stats("basic")["requests_today"] == 0
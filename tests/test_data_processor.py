@@ -0,0 +1,64 @@
+import os
+import torch
+from src.core import DataProcessor
+from src.core.data_processor import StreamingSMSDataset
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "src", "data", "SMSSpamCollection")
+
+def write_corpus(path, rows):
+    with open(path, "w") as f:
+        for label, text in rows:
+            f.write(f"{label}\t{text}\n")
+
+def test_streaming_dataset_yields_every_row(tmp_path):
+    """Test that every row is streamed exactly once across chunks."""
+    path = tmp_path / "corpus.tsv"
+    rows = [("spam" if i % 3 == 0 else "ham", f"message number {i}") for i in range(25)]
+    write_corpus(path, rows)
+
+    dataset = StreamingSMSDataset(str(path), n_features=32, chunk_size=4, shuffle_buffer_size=8)
+    samples = list(dataset)
+
+    assert len(samples) == 25
+    assert sum(s["labels"] for s in samples) == 9
+    assert samples[0]["input_ids"].shape == (32,)
+
+def test_streaming_dataset_shards_by_rank(tmp_path):
+    """Test that distributed ranks receive disjoint shards covering the file."""
+    path = tmp_path / "corpus.tsv"
+    write_corpus(path, [("ham", f"message {i}") for i in range(20)])
+
+    counts = [
+        len(list(StreamingSMSDataset(str(path), n_features=16, chunk_size=3, rank=rank, world_size=2)))
+        for rank in range(2)
+    ]
+    assert sum(counts) == 20
+    assert counts == [10, 10]
+
+def test_streaming_dataset_shards_within_a_chunk(tmp_path):
+    """Test that ranks share rows when the file fits in a single chunk."""
+    path = tmp_path / "corpus.tsv"
+    write_corpus(path, [("spam" if i % 2 else "ham", f"message {i}") for i in range(7)])
+
+    shards = [
+        list(StreamingSMSDataset(str(path), n_features=16, chunk_size=100, shuffle_buffer_size=0,
+                                 rank=rank, world_size=3))
+        for rank in range(3)
+    ]
+    assert [len(shard) for shard in shards] == [3, 2, 2]
+    assert [s["labels"] for s in shards[1]] == [1, 0]
+
+def test_streaming_dataloader_with_workers():
+    """Test multi-worker streaming over the bundled corpus."""
+    loader = DataProcessor().create_streaming_dataloader(
+        DATA_PATH, batch_size=256, n_features=64, num_workers=2, chunk_size=1000, shuffle_buffer_size=500
+    )
+    total = 0
+    spam = 0
+    for batch in loader:
+        assert batch["input_ids"].shape[1] == 64
+        total += len(batch["labels"])
+        spam += int(batch["labels"].sum())
+
+    assert total == 5572
+    assert spam == 747
@@ -1,8 +1,10 @@
 import os
+import json
 import pytest
 import asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from src.core import DeepSeekMCPClient, DeepSeekMCPError
+from src.utils import get_tier_config
 
 @pytest.fixture
 def client():
@@ -87,10 +89,313 @@ def test_set_tier(client):
     with pytest.raises(ValueError):
         client.set_tier("invalid_tier")
 
+@pytest.mark.asyncio
+async def test_process_text_explicit_tier(client):
+    """Test that a per-call tier is used without changing the shared client's tier."""
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        mock_post.return_value.__aenter__.return_value.status = 200
+        mock_post.return_value.__aenter__.return_value.json = AsyncMock(
+            return_value={"choices": [{"message": {"content": '{"label": "ham", "score": 0.1}'}}]}
+        )
+
+        await client.process_text("Hello", tier="premium")
+
+        assert json.loads(mock_post.call_args.kwargs["data"])["tier"] == "premium"
+        assert client.tier == "free"
+
+    with pytest.raises(ValueError):
+        await client.process_text("Hello", tier="gold")
+
 def test_get_usage_stats(client):
     """Test usage statistics."""
     stats = client.get_usage_stats()
     assert "tier" in stats
     assert "cache_size" in stats
     assert "cache_hits" in stats
-    assert "timestamp" in stats 
\ No newline at end of file
+    assert "timestamp" in stats 
+
+
+@pytest.mark.asyncio
+async def test_batch_process_packed(client):
+    """Test that packed batches make one request and parse per-item results."""
+    packed_response = {
+        "choices": [{"message": {"content": '[{"index": 1, "label": "spam", "score": 0.9}, '
+                                            '{"index": 2, "label": "ham", "score": 0.1}]'}}]
+    }
+
+    with patch.object(client, "process_text", return_value=packed_response) as mock_process:
+        results = await client.batch_process(["Text 1", "Text 2"], pack=True)
+
+        assert mock_process.call_count == 1
+        assert mock_process.call_args.kwargs["classify"] is False
+        assert [r["result"]["label"] for r in results] == ["spam", "ham"]
+        assert all(r["status"] == "success" for r in results)
+
+@pytest.mark.asyncio
+async def test_batch_process_packed_fallback(client):
+    """Test that an unparseable packed answer falls back to per-item requests."""
+    bad_response = {"choices": [{"message": {"content": "not json"}}]}
+    item_response = {"result": "success"}
+
+    with patch.object(client, "process_text", side_effect=[bad_response, item_response, item_response]) as mock_process:
+        results = await client.batch_process(["Text 1", "Text 2"], pack=True)
+
+        assert mock_process.call_count == 3
+        assert all(r["result"] == item_response for r in results)
+
+@pytest.mark.asyncio
+async def test_batch_process_packed_uses_cache(client):
+    """Test that packed items are cached per text and cached texts are not packed."""
+    packed_response = {
+        "choices": [{"message": {"content": '[{"index": 1, "label": "spam", "score": 0.9}, '
+                                            '{"index": 2, "label": "ham", "score": 0.1}]'}}]
+    }
+
+    with patch.object(client, "process_text", return_value=packed_response) as mock_process:
+        await client.batch_process(["Text 1", "Text 2"], pack=True)
+        results = await client.batch_process(["Text 1", "Text 2"], pack=True)
+
+        assert mock_process.call_count == 1
+        assert [r["result"]["label"] for r in results] == ["spam", "ham"]
+        assert all(r["result"]["reason"] == "packed" for r in results)
+
+    # Single-text requests share the cache entries
+    result = await client.process_text("Text 1")
+    assert result["label"] == "spam"
+    assert client.get_usage_stats()["cached_responses"] == 3
+
+@pytest.mark.asyncio
+async def test_batch_process_packed_prompt_is_not_truncated(client):
+    """Test that non-ASCII packs fit the tier budget and reach upstream whole."""
+    texts = [f"Привет, это сообщение номер {i} о встрече завтра в офисе. " * 3 for i in range(30)]
+    prompts = []
+
+    async def fake_process_text(text, *args, **kwargs):
+        prompts.append(text)
+        count = text.count("\n") - 1
+        items = [{"index": n, "label": "ham", "score": "high"} for n in range(1, count + 1)]
+        return {"choices": [{"message": {"content": json.dumps(items)}}]}
+
+    with patch.object(client, "process_text", side_effect=fake_process_text):
+        results = await client.batch_process(texts, pack=True, tier="free")
+
+    budget = get_tier_config()["free"]["max_input_tokens"] * 4
+    assert len(prompts) > 1
+    assert all(len(prompt) <= budget for prompt in prompts)
+    assert all("[...]" not in client._preflight([prompt], "free")[0] for prompt in prompts)
+    assert sum(prompt.count("Привет") for prompt in prompts) == 90
+    assert all(r["result"]["label"] == "ham" for r in results)
+    # A score that is not a number is dropped rather than returned
+    assert all(r["result"]["score"] is None for r in results)
+
+def test_build_packs_respects_budget(client):
+    """Test that packs are split by token budget and tier max_tokens."""
+    texts = ["x" * 400] * 10
+    packs = client._build_packs(texts, token_budget=500)
+    assert len(packs) >= 3
+    assert all(len(p) <= 4 for p in packs)
+    assert sorted(i for p in packs for i in p) == list(range(10))
+
+    client.pack_answer_tokens = 500
+    assert all(len(p) <= 2 for p in client._build_packs(["short"] * 10, token_budget=10000))
+
+@pytest.mark.asyncio
+async def test_process_text_cache_normalized(client):
+    """Test that whitespace and case variants share a cached result."""
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        mock_post.return_value.__aenter__.return_value.status = 200
+        mock_post.return_value.__aenter__.return_value.json = AsyncMock(
+            return_value={"choices": [{"message": {"content": '{"label": "spam", "score": 0.9}'}}]}
+        )
+
+        await client.process_text("FREE entry  now")
+        await client.process_text("  free Entry now ")
+
+        assert mock_post.call_count == 1
+        sent = json.loads(mock_post.call_args.kwargs["data"])["messages"][-1]["content"]
+        assert sent == "FREE entry now"
+
+class FakeModelStore:
+    """Local model stand-in returning fixed spam probabilities."""
+
+    def __init__(self, probs, version=7):
+        self.probs = probs
+        self.version = version
+        self.temperatures = []
+
+    def current(self):
+        return self.version, None
+
+    def predict_proba(self, texts, model=None, temperature=1.0):
+        import numpy as np
+        self.temperatures.append(temperature)
+        return self.version, np.array([self.probs[text] for text in texts])
+
+@pytest.mark.asyncio
+async def test_batch_process_cascade(client):
+    """Test that only uncertain texts are escalated upstream."""
+    calibration = {
+        "model_version": 7,
+        "temperature": 1.5,
+        "thresholds": {"0.95": {"ham_threshold": 0.1, "spam_threshold": 0.9}}
+    }
+    client.set_cascade(FakeModelStore({"spam": 0.99, "ham": 0.01, "unsure": 0.5}), calibration)
+
+    with patch.object(client, "process_text", return_value={"result": "success"}) as mock_process:
+        results = await client.batch_process(["spam", "ham", "unsure"])
+
+        assert mock_process.call_count == 1
+        assert mock_process.call_args.args[0] == "unsure"
+        assert results[0]["result"]["label"] == "spam"
+        assert results[0]["result"]["reason"] == "cascade"
+        assert results[0]["result"]["model_version"] == 7
+        assert results[1]["result"]["label"] == "ham"
+        assert results[2]["result"] == {"result": "success"}
+
+    stats = client.get_usage_stats()["cascade"]
+    assert stats["local"] == 2
+    assert stats["escalated"] == 1
+    assert stats["uncalibrated"] == 0
+    assert client.model_store.temperatures == [1.5]
+
+@pytest.mark.asyncio
+async def test_batch_process_cascade_escalates_other_model_version(client):
+    """Test that a swapped-in model version without a calibration is not trusted."""
+    calibration = {
+        "model_version": 7,
+        "temperature": 1.5,
+        "thresholds": {"0.95": {"ham_threshold": 0.1, "spam_threshold": 0.9}}
+    }
+    store = FakeModelStore({"spam": 0.99, "ham": 0.01}, version=8)
+    client.set_cascade(store, calibration)
+
+    with patch.object(client, "process_text", return_value={"result": "success"}) as mock_process:
+        results = await client.batch_process(["spam", "ham"])
+
+        assert mock_process.call_count == 2
+        assert all(item["result"] == {"result": "success"} for item in results)
+    assert store.temperatures == []
+
+    stats = client.get_usage_stats()["cascade"]
+    assert stats["escalated"] == 2
+    assert stats["uncalibrated"] == 2
+    assert stats["calibrated_versions"] == [7]
+    assert stats["serving_version"] == 8
+
+    # Registering a calibration for the new version re-enables the cascade
+    client.set_cascade(store, dict(calibration, model_version=8))
+    with patch.object(client, "process_text", return_value={"result": "success"}) as mock_process:
+        results = await client.batch_process(["spam", "ham"])
+
+        assert mock_process.call_count == 0
+        assert results[0]["result"]["model_version"] == 8
+
+@pytest.mark.asyncio
+async def test_batch_process_cascade_counts_missing_thresholds(client):
+    """Test that texts escalated for lack of a tier threshold are counted."""
+    calibration = {
+        "model_version": 7,
+        "temperature": 1.5,
+        "thresholds": {"0.5": {"ham_threshold": 0.1, "spam_threshold": 0.9}}
+    }
+    client.set_cascade(FakeModelStore({"spam": 0.99, "ham": 0.01}), calibration)
+
+    with patch.object(client, "process_text", return_value={"result": "success"}) as mock_process:
+        await client.batch_process(["spam", "ham"])
+
+        assert mock_process.call_count == 2
+
+    stats = client.get_usage_stats()["cascade"]
+    assert stats["escalated"] == 2
+    assert stats["uncalibrated"] == 2
+    assert stats["escalation_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_batch_process_prefilter(client, tmp_path):
+    """Test that texts matching prefilter rules are not sent upstream."""
+    from src.core import Prefilter
+
+    rules = tmp_path / "rules.jsonl"
+    rules.write_text('{"id": "txt_stop", "pattern": "txt stop", "label": "spam"}\n')
+    client.set_prefilter(Prefilter(str(rules)))
+
+    with patch.object(client, "process_text", return_value={"result": "success"}) as mock_process:
+        results = await client.batch_process(["Txt STOP to end", "Hello"])
+
+        assert mock_process.call_count == 1
+        assert results[0]["result"]["reason"] == "prefilter:txt_stop"
+        assert results[1]["result"] == {"result": "success"}
+
+    assert client.get_usage_stats()["prefilter"]["hits"] == {"txt_stop": 1}
+
+@pytest.mark.asyncio
+async def test_batch_process_preflights_before_local_stages(client, tmp_path):
+    """Test that batch items are normalized before the prefilter, like process_text does."""
+    from src.core import Prefilter
+
+    rules = tmp_path / "rules.jsonl"
+    rules.write_text('{"id": "txt_stop", "pattern": "txt stop", "label": "spam"}\n')
+    client.set_prefilter(Prefilter(str(rules)))
+
+    with patch.object(client, "process_text", return_value={"label": "ham"}) as mock_process:
+        results = await client.batch_process(["Txt  STOP now", "Hello \u3000 there  " + "x" * 10000])
+
+        assert results[0]["result"]["reason"] == "prefilter:txt_stop"
+        assert mock_process.call_count == 1
+        sent = mock_process.call_args.args[0]
+        assert sent.startswith("Hello there x")
+        assert len(sent) <= get_tier_config()["free"]["max_input_tokens"] * 4
+
+    assert client.get_usage_stats()["truncated_inputs"] == 1
+
+@pytest.mark.asyncio
+async def test_process_text_rejects_unknown_options(client):
+    """Test that options outside the allowlist are rejected without a request."""
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        with pytest.raises(ValueError):
+            await client.process_text("Test text", {"model": "other-model"})
+        with pytest.raises(ValueError):
+            await client.process_text("Test text", {"max_tokens": 100000})
+
+        assert not mock_post.called
+
+@pytest.mark.asyncio
+async def test_process_text_caches_compact_result(client):
+    """Test that responses are parsed once and only the compact result is cached."""
+    from src.core.results import ClassificationResult
+
+    raw_response = {
+        "model": "deepseek-chat",
+        "choices": [{"message": {"role": "assistant", "content": '{"label": "spam", "score": 0.93}'}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 9}
+    }
+    with patch("aiohttp.ClientSession.post") as mock_post:
+        mock_post.return_value.__aenter__.return_value.status = 200
+        mock_post.return_value.__aenter__.return_value.json = AsyncMock(return_value=raw_response)
+
+        result = await client.process_text("Win a prize")
+        assert result["label"] == "spam"
+        assert result["score"] == 0.93
+        assert result["reason"] == "upstream"
+        assert result["model_version"] == "deepseek-chat"
+        assert "choices" not in result
+
+        _, cached = next(iter(client.cache.values()))
+        assert isinstance(cached, ClassificationResult)
+        assert await client.process_text("Win a prize") == result
+        assert mock_post.call_count == 1
+
+        # Raw output bypasses the cache
+        assert await client.process_text("Win a prize", raw=True) == raw_response
+        assert mock_post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_batch_process_raw(client):
+    """Test that texts are only echoed back when raw output is requested."""
+    with patch.object(client, "process_text", return_value={"label": "ham"}) as mock_process:
+        compact = await client.batch_process(["Text 1"])
+        raw = await client.batch_process(["Text 1"], raw=True)
+
+    assert "text" not in compact[0]
+    assert raw[0]["text"] == "Text 1"
+    assert mock_process.call_args.kwargs["raw"] is True
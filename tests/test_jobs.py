@@ -0,0 +1,120 @@
+import os
+import asyncio
+import pytest
+from src.core import JobManager, JobNotFoundError
+
+class FakeClient:
+    """Minimal stand-in for DeepSeekMCPClient."""
+
+    def __init__(self, fail_on=None):
+        self.tier = "free"
+        self.fail_on = fail_on or set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process_text(self, text, options=None, tier=None):
+        self.tier = tier
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        if text in self.fail_on:
+            raise Exception("Test error")
+        return {"echo": text}
+
+async def wait_for_job(manager, job_id):
+    for _ in range(1000):
+        state = manager.get_job(job_id)
+        if state["status"] in ("completed", "failed"):
+            return state
+        await asyncio.sleep(0.01)
+    raise AssertionError("Job did not finish")
+
+@pytest.mark.asyncio
+async def test_job_completes_with_chunked_results(tmp_path):
+    """Test that a job is processed in chunks with bounded concurrency."""
+    fake = FakeClient(fail_on={"Text 3"})
+    manager = JobManager(fake, jobs_dir=str(tmp_path), max_workers=2, chunk_size=4)
+    texts = [f"Text {i}" for i in range(10)]
+
+    job_id = await manager.submit(texts, tier="basic")
+    state = await wait_for_job(manager, job_id)
+    await manager.stop()
+
+    assert state["status"] == "completed"
+    assert state["processed"] == 10
+    assert state["failed"] == 1
+    assert state["total_chunks"] == 3
+    assert fake.tier == "basic"
+    assert fake.max_in_flight <= 2
+
+    page = manager.get_results(job_id, 0)
+    assert page["next_chunk"] == 1
+    assert [r["result"]["echo"] for r in page["results"] if r["status"] == "success"] == \
+        ["Text 0", "Text 1", "Text 2"]
+    assert page["results"][3]["status"] == "error"
+
+    last = manager.get_results(job_id, 2)
+    assert last["next_chunk"] is None
+    assert len(last["results"]) == 2
+
+@pytest.mark.asyncio
+async def test_job_resumes_after_restart(tmp_path):
+    """Test that unfinished jobs are resumed from disk by a new manager."""
+    manager = JobManager(FakeClient(), jobs_dir=str(tmp_path), chunk_size=2)
+    job_id = await manager.submit(["a", "b", "c"])
+    await manager.stop()
+
+    # Simulate a crash after the first chunk was persisted
+    state = manager.get_job(job_id)
+    state.update(status="running", completed_chunks=0, processed=0)
+    manager._save_state(state)
+
+    restarted = JobManager(FakeClient(), jobs_dir=str(tmp_path), chunk_size=2)
+    await restarted.start()
+    state = await wait_for_job(restarted, job_id)
+    await restarted.stop()
+
+    assert state["status"] == "completed"
+    assert state["processed"] == 3
+
+def test_unknown_job(tmp_path):
+    """Test lookup of missing or malformed job IDs."""
+    manager = JobManager(FakeClient(), jobs_dir=str(tmp_path))
+
+    with pytest.raises(JobNotFoundError):
+        manager.get_job("deadbeef")
+    with pytest.raises(JobNotFoundError):
+        manager.get_job("../etc")
+
+@pytest.mark.asyncio
+async def test_locked_job_is_skipped(tmp_path):
+    """Test that a job locked by another worker is not processed twice."""
+    import fcntl
+
+    manager = JobManager(FakeClient(), jobs_dir=str(tmp_path))
+    job_id = await manager.submit(["a"])
+    await manager.stop()
+    state = manager.get_job(job_id)
+    state.update(status="queued", completed_chunks=0, processed=0)
+    manager._save_state(state)
+
+    with open(os.path.join(str(tmp_path), job_id, "lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        other = JobManager(FakeClient(), jobs_dir=str(tmp_path))
+        await other._process_job(job_id)
+
+    assert other.get_job(job_id)["status"] == "queued"
+
+@pytest.mark.asyncio
+async def test_jobs_dir_is_created_on_first_submit(tmp_path):
+    """Test that the jobs directory is only created when a job is submitted."""
+    jobs_dir = tmp_path / "jobs"
+    manager = JobManager(FakeClient(), jobs_dir=str(jobs_dir))
+    await manager.start()
+    assert not jobs_dir.exists()
+
+    job_id = await manager.submit(["a"])
+    assert (await wait_for_job(manager, job_id))["status"] == "completed"
+    assert jobs_dir.is_dir()
+    await manager.stop()
@@ -0,0 +1,57 @@
+import json
+import pytest
+from src.core.payload import PayloadTemplates, CLASSIFY_PROMPT
+from src.utils import get_tier_config
+
+@pytest.fixture
+def templates():
+    return PayloadTemplates()
+
+def test_render_applies_tier_defaults(templates):
+    """Test that rendered bodies carry the tier's max_tokens and temperature."""
+    body = json.loads(templates.render("basic", (), 'Say "hi" é'))
+
+    assert body["model"] == "deepseek-chat"
+    assert body["tier"] == "basic"
+    assert body["max_tokens"] == get_tier_config()["basic"]["max_tokens"]
+    assert body["temperature"] == get_tier_config()["basic"]["temperature"]
+    assert body["messages"] == [
+        {"role": "system", "content": CLASSIFY_PROMPT},
+        {"role": "user", "content": 'Say "hi" é'}
+    ]
+
+def test_render_without_classify_prompt(templates):
+    """Test that requests with their own instructions get only the user message."""
+    body = json.loads(templates.render("free", (), "Classify these", classify=False))
+    assert body["messages"] == [{"role": "user", "content": "Classify these"}]
+
+def test_options_override_defaults(templates):
+    """Test that allowed options override template fields."""
+    key = templates.options_key("free", {"temperature": 0.1, "stop": ["\n"]})
+    body = json.loads(templates.render("free", key, "text"))
+
+    assert body["temperature"] == 0.1
+    assert body["stop"] == ["\n"]
+    assert key == templates.options_key("free", {"stop": ["\n"], "temperature": 0.1})
+
+@pytest.mark.parametrize("options", [
+    {"messages": []},
+    {"tier": "premium"},
+    {"max_tokens": 5000},
+    {"temperature": "hot"},
+    {"top_p": 0},
+    {"stop": [1]},
+])
+def test_invalid_options(templates, options):
+    """Test that options outside the allowlist or tier limits are rejected."""
+    with pytest.raises(ValueError):
+        templates.options_key("free", options)
+
+def test_template_cache_is_bounded():
+    """Test that option-specific templates are evicted but tier defaults are kept."""
+    templates = PayloadTemplates(max_templates=8)
+    for seed in range(10):
+        templates.render("free", templates.options_key("free", {"seed": seed}), "text")
+
+    assert len(templates._templates) <= 8
+    assert ("premium", (), True) in templates._templates
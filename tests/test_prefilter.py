@@ -0,0 +1,99 @@
+import os
+import json
+import pytest
+from src.core import Prefilter, PrefilterError
+from src.core.prefilter import compile_rules
+
+def write_rules(path, rules):
+    with open(path, "w") as f:
+        f.write("# test rules\n")
+        for rule in rules:
+            f.write(json.dumps(rule) + "\n")
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "rules.jsonl"
+    write_rules(path, [
+        {"id": "txt_stop", "pattern": "txt STOP", "label": "spam"},
+        {"id": "short_code", "pattern": r"\b(\d{5})\b", "regex": True, "label": "spam"},
+        {"id": "url", "pattern": "example.com/win", "label": "spam"},
+    ])
+    return str(path)
+
+def test_match(rules_path):
+    """Test matching literal and regex rules."""
+    prefilter = Prefilter(rules_path)
+
+    assert prefilter.match("Reply TXT stop to end")["rule"] == "txt_stop"
+    assert prefilter.match("Send WIN to 87121 now")["rule"] == "short_code"
+    assert prefilter.match("visit EXAMPLE.COM/WIN")["rule"] == "url"
+    assert prefilter.match("exampleXcom/win") is None
+    assert prefilter.match("See you at 5") is None
+    assert prefilter.rule_count == 3
+
+def test_group_indexes_account_for_inner_groups():
+    """Test that rules after patterns with their own groups are identified."""
+    matcher = compile_rules([
+        {"id": "a", "pattern": "(x)(y)z", "regex": True, "label": "spam"},
+        {"id": "b", "pattern": "h(e)llo", "regex": True, "label": "ham"},
+    ])
+    assert matcher.search("say hello")["id"] == "b"
+    assert matcher.search("xyz")["id"] == "a"
+
+def test_leftmost_rule_wins():
+    """Test that the leftmost match wins across literal and regex rules, then file order."""
+    matcher = compile_rules([
+        {"id": "late_literal", "pattern": "prize", "label": "spam"},
+        {"id": "regex", "pattern": r"\bwon\b", "regex": True, "label": "spam"},
+        {"id": "long_literal", "pattern": "you have won a prize", "label": "spam"},
+        {"id": "short_literal", "pattern": "you have", "label": "ham"},
+    ])
+    assert matcher.search("So YOU HAVE WON A PRIZE")["id"] == "long_literal"
+    assert matcher.search("we won a prize")["id"] == "regex"
+    assert matcher.search("a prize")["id"] == "late_literal"
+    assert matcher.search("nothing here") is None
+    assert compile_rules([]).search("anything") is None
+
+def test_hot_reload(rules_path):
+    """Test that a modified rules file is picked up and broken files are ignored."""
+    prefilter = Prefilter(rules_path)
+    assert prefilter.match("free entry") is None
+
+    write_rules(rules_path, [{"id": "free_entry", "pattern": "free entry", "label": "spam"}])
+    os.utime(rules_path, ns=(0, 10 ** 18))
+    # Matching never touches the file; the reload happens separately
+    assert prefilter.match("free entry") is None
+    assert prefilter.reload() is True
+    assert prefilter.match("free entry")["rule"] == "free_entry"
+    assert prefilter.rule_count == 1
+
+    with open(rules_path, "w") as f:
+        f.write('{"id": "broken", "pattern": "(", "regex": true, "label": "spam"}\n')
+    os.utime(rules_path, ns=(0, 2 * 10 ** 18))
+    assert prefilter.reload() is False
+    assert prefilter.match("free entry")["rule"] == "free_entry"
+
+def test_background_reload(rules_path):
+    """Test that the background thread picks up a modified rules file."""
+    import time
+
+    prefilter = Prefilter(rules_path, check_interval=0.02)
+    prefilter.start()
+    try:
+        write_rules(rules_path, [{"id": "free_entry", "pattern": "free entry", "label": "spam"}])
+        os.utime(rules_path, ns=(0, 10 ** 18))
+        deadline = time.time() + 5
+        while prefilter.match("free entry") is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert prefilter.match("free entry")["rule"] == "free_entry"
+    finally:
+        prefilter.stop()
+
+def test_invalid_rule(tmp_path):
+    """Test rule validation."""
+    path = tmp_path / "rules.jsonl"
+    write_rules(path, [{"id": "x", "pattern": "y", "label": "maybe"}])
+
+    from src.core.prefilter import load_rules
+    with pytest.raises(PrefilterError):
+        load_rules(str(path))
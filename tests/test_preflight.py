@@ -0,0 +1,33 @@
+from src.core.preflight import (
+    TRUNCATION_MARKER, estimate_tokens, normalize_text, cache_key_text, truncate_text, preflight
+)
+
+def test_normalize_text():
+    """Test whitespace and unicode normalization."""
+    assert normalize_text("  Free   entry\t\tnow \n\n\n WIN  ") == "Free entry now\nWIN"
+    assert normalize_text("ＦＲＥＥ") == "FREE"
+
+def test_cache_key_ignores_case_and_whitespace():
+    """Test that trivial variants share a cache key."""
+    assert cache_key_text(normalize_text("FREE  Entry ")) == cache_key_text(normalize_text("free entry"))
+
+def test_truncate_keeps_head_and_tail():
+    """Test head/tail truncation to a token budget."""
+    text = "a" * 1000 + "b" * 1000
+    truncated, cut = truncate_text(text, max_tokens=100)
+
+    assert cut
+    assert len(truncated) <= 400
+    assert truncated.startswith("aaa")
+    assert truncated.endswith("bbb")
+    assert TRUNCATION_MARKER in truncated
+
+    assert truncate_text("short", max_tokens=100) == ("short", False)
+
+def test_preflight_bounds_large_inputs():
+    """Test that multi-megabyte inputs are cut to the budget."""
+    text, truncated = preflight("word   " * 1000000, max_tokens=1000)
+
+    assert truncated
+    assert estimate_tokens(text) <= 1001
+    assert "  " not in text
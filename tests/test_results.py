@@ -0,0 +1,44 @@
+import pytest
+from src.core.results import ClassificationResult
+
+def make_response(content, model="deepseek-chat"):
+    return {"model": model, "choices": [{"message": {"role": "assistant", "content": content}}]}
+
+def test_parse_json_object():
+    """Test parsing a JSON label and score out of the message content."""
+    result = ClassificationResult.from_response(
+        make_response('Result: {"label": "Spam", "score": 0.8}'), latency=0.25
+    )
+    assert result == ClassificationResult("spam", 0.8, "upstream", "deepseek-chat", 0.25)
+
+def test_parse_fenced_json():
+    """Test that a JSON answer inside a code fence is read."""
+    result = ClassificationResult.from_response(make_response('```json\n{"label": "ham"}\n```'))
+    assert result.label == "ham"
+    assert result.score is None
+    assert result.reason == "upstream"
+
+@pytest.mark.parametrize("response", [
+    make_response("This message is not spam."),
+    make_response('{"label": "maybe", "score": 0.5}'),
+    make_response("I cannot tell."),
+    make_response(None),
+    {"choices": []},
+])
+def test_parse_unlabeled(response):
+    """Test that responses without a label are marked unparsed."""
+    result = ClassificationResult.from_response(response)
+    assert result.label is None
+    assert result.reason == "unparsed"
+
+def test_compact_record():
+    """Test that the record has no per-instance dict and serializes to plain fields."""
+    result = ClassificationResult("spam", 1.0, "prefilter:txt_stop")
+    assert not hasattr(result, "__dict__")
+    assert result.to_dict() == {
+        "label": "spam",
+        "score": 1.0,
+        "reason": "prefilter:txt_stop",
+        "model_version": None,
+        "latency": 0.0
+    }
@@ -0,0 +1,162 @@
+import os
+import torch
+import pytest
+from src.core import ModelStore, OnlineLearner
+from src.core.serving import latest_checkpoint_version
+from src.core.train import SimpleClassifier
+
+@pytest.fixture
+def store():
+    """Create a store with a small untrained model."""
+    torch.manual_seed(0)
+    return ModelStore(SimpleClassifier(input_size=64, hidden_size=8))
+
+def test_predict_proba(store):
+    """Test that predictions are probabilities from the current version."""
+    version, probs = store.predict_proba(["Free entry now", "See you later"])
+    assert version == 0
+    assert probs.shape == (2,)
+    assert ((probs >= 0) & (probs <= 1)).all()
+
+def test_snapshot_survives_swap(store):
+    """Test that a snapshot keeps its model after a swap."""
+    version, model = store.current()
+    store.swap(SimpleClassifier(input_size=64, hidden_size=8), 5)
+
+    assert store.version == 5
+    assert store.current()[1] is not model
+    assert version == 0
+
+def test_online_update_writes_checkpoint_and_swaps(store, tmp_path):
+    """Test that feedback updates produce a new versioned model."""
+    learner = OnlineLearner(store, checkpoint_dir=str(tmp_path), batch_size=4, learning_rate=0.5, epochs=20)
+    _, old_model = store.current()
+    texts = ["WIN a FREE prize txt now", "are we still on for lunch"] * 4
+    labels = [1, 0] * 4
+
+    assert learner.add_feedback(texts, labels) == 8
+    _, before = store.predict_proba(texts[:2])
+    assert learner.update() == 1
+    _, after = store.predict_proba(texts[:2])
+
+    assert store.version == 1
+    assert store.current()[1] is not old_model
+    assert latest_checkpoint_version(str(tmp_path)) == 1
+    assert after[0] > before[0]
+    assert after[1] < before[1]
+    assert learner.update() is None
+
+def test_online_update_is_validated_by_watcher(store, tmp_path):
+    """Test that learner output is validated before it is written or served."""
+    from src.core import ModelWatcher
+
+    watcher = ModelWatcher(store, str(tmp_path), ["a", "b"], [0, 1], min_accuracy=1.1)
+    learner = OnlineLearner(store, checkpoint_dir=str(tmp_path), watcher=watcher)
+    learner.add_feedback(["a", "b"], [0, 1])
+
+    assert learner.update() is None
+    assert store.version == 0
+    assert latest_checkpoint_version(str(tmp_path)) == 0
+
+    watcher.min_accuracy = 0.0
+    learner.add_feedback(["a", "b"], [0, 1])
+    assert learner.update() == 1
+    assert store.version == 1
+    assert latest_checkpoint_version(str(tmp_path)) == 1
+
+def biased_model(label):
+    """Create a model that always predicts label."""
+    model = SimpleClassifier(input_size=64, hidden_size=8)
+    with torch.no_grad():
+        model.fc2.weight.zero_()
+        model.fc2.bias.copy_(torch.tensor([1.0, -1.0]) if label == 0 else torch.tensor([-1.0, 1.0]))
+    return model
+
+def test_watcher_falls_back_to_newest_valid_version(store, tmp_path):
+    """Test that a rejected newest checkpoint is skipped for an earlier valid one."""
+    from src.core import ModelWatcher
+    from src.core.serving import save_checkpoint
+
+    save_checkpoint(biased_model(0), str(tmp_path), 1)
+    save_checkpoint(biased_model(1), str(tmp_path), 2)
+    watcher = ModelWatcher(store, str(tmp_path), ["a", "b"], [0, 0], min_accuracy=0.9)
+
+    assert watcher.check() is True
+    assert store.version == 1
+    assert watcher.rejected_versions == {2}
+    assert watcher.check() is False
+
+def test_new_checkpoint_versions_are_unique(tmp_path):
+    """Test that concurrent writers never allocate the same version."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.core.serving import save_new_checkpoint
+
+    model = SimpleClassifier(input_size=64, hidden_size=8)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        versions = [version for version, _ in pool.map(
+            lambda _: save_new_checkpoint(model, str(tmp_path)), range(16)
+        )]
+
+    assert sorted(versions) == list(range(1, 17))
+    assert sorted(os.listdir(tmp_path)) == [f"model_v{v:06d}.pt" for v in range(1, 17)]
+
+def test_feedback_validation(store, tmp_path):
+    """Test feedback argument validation."""
+    learner = OnlineLearner(store, checkpoint_dir=str(tmp_path))
+    with pytest.raises(ValueError):
+        learner.add_feedback(["a"], [1, 0])
+    with pytest.raises(ValueError):
+        learner.add_feedback(["a"], [2])
+
+def test_watcher_hot_reloads_valid_versions(store, tmp_path):
+    """Test that the watcher swaps in new versions that pass validation."""
+    from src.core import ModelWatcher
+    from src.core.serving import save_checkpoint
+
+    watcher = ModelWatcher(store, str(tmp_path), ["a"], [0], min_accuracy=0.0)
+    assert watcher.check() is False
+
+    save_checkpoint(SimpleClassifier(input_size=64, hidden_size=8), str(tmp_path), 3)
+    _, old_model = store.current()
+    assert watcher.check() is True
+    assert store.version == 3
+    assert store.current()[1] is not old_model
+    assert watcher.check() is False
+
+def test_watcher_rejects_invalid_versions(store, tmp_path):
+    """Test that versions failing holdout validation are not served."""
+    from src.core import ModelWatcher
+    from src.core.serving import save_checkpoint
+
+    watcher = ModelWatcher(store, str(tmp_path), ["a", "b"], [0, 1], min_accuracy=1.1)
+    save_checkpoint(SimpleClassifier(input_size=64, hidden_size=8), str(tmp_path), 1)
+
+    assert watcher.check() is False
+    assert store.version == 0
+    assert 1 in watcher.rejected_versions
+
+def test_load_checkpoint_roundtrip(tmp_path):
+    """Test that a saved checkpoint loads with the same weights."""
+    from src.core.serving import save_checkpoint, load_checkpoint
+
+    model = SimpleClassifier(input_size=64, hidden_size=8)
+    path = save_checkpoint(model, str(tmp_path), 1)
+    loaded = load_checkpoint(path)
+
+    assert loaded.fc1.in_features == 64
+    assert torch.equal(loaded.fc1.weight, model.fc1.weight)
+
+def test_fallback_model_passes_default_gate():
+    """Test that the shipped fallback model was trained on the served hashed features."""
+    from src.core import ModelWatcher
+    from src.core.serving import load_holdout
+
+    path = os.path.join(os.path.dirname(__file__), "..", "src", "models", "best_model.pt")
+    data = os.path.join(os.path.dirname(__file__), "..", "src", "data", "SMSSpamCollection")
+    store = ModelStore.from_checkpoint(path)
+    watcher = ModelWatcher(store, "", *load_holdout(data, sample_size=500))
+
+    assert watcher.accepts(store.current()[1])
+    _, probs = store.predict_proba(["WINNER!! Claim your FREE prize now, txt WIN to 81010",
+                                    "Are we still meeting for lunch tomorrow?"])
+    assert probs[0] > 0.5 > probs[1]
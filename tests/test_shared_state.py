@@ -0,0 +1,85 @@
+import multiprocessing
+from src.utils import SharedState
+
+def acquire_many(path, attempts, results):
+    state = SharedState(path)
+    granted = sum(state.acquire("bucket", limit=100, window=60) for _ in range(attempts))
+    state.increment("requests", attempts)
+    results.put(granted)
+
+def test_rate_limit_is_exact_across_processes(tmp_path):
+    """Test that concurrent workers never exceed a shared limit."""
+    path = str(tmp_path / "state.db")
+    SharedState(path)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=acquire_many, args=(path, 50, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(results.get() for _ in workers) == 100
+    state = SharedState(path)
+    assert state.get_bucket("bucket")[0] == 100
+    assert state.get_counters()["requests"] == 200
+    assert state.worker_count() == 4
+
+def test_counters_and_reset():
+    """Test counter aggregation and reset."""
+    state = SharedState()
+    state.increment("a")
+    state.increment("a", 2.5)
+    state.increment("b", 0)
+
+    assert state.get_counters() == {"a": 3.5}
+    state.reset_counters()
+    assert state.get_counters() == {}
+
+def test_expired_bucket_resets():
+    """Test that a bucket starts over once its window has passed."""
+    state = SharedState()
+    assert state.acquire("k", limit=1, window=-1)
+    assert state.get_bucket("k") is None
+    assert state.acquire("k", limit=1, window=60)
+    assert not state.acquire("k", limit=1, window=60)
+
+def test_acquire_amount_is_all_or_nothing():
+    """Test that taking several requests at once never overshoots the limit."""
+    state = SharedState()
+    assert state.acquire("k", limit=10, window=60, amount=7)
+    assert not state.acquire("k", limit=10, window=60, amount=4)
+    assert state.get_bucket("k")[0] == 7
+    assert state.acquire("k", limit=10, window=60, amount=3)
+
+def test_counters_are_flushed_in_batches(tmp_path):
+    """Test that increments are aggregated in memory until a flush."""
+    path = str(tmp_path / "state.db")
+    state = SharedState(path, flush_interval=60)
+    reader = SharedState(path)
+    for _ in range(100):
+        state.increment("requests")
+
+    assert reader.get_counters() == {}
+    state.flush()
+    assert reader.get_counters() == {"requests": 100}
+
+    state.increment("requests", 5)
+    state.close()
+    assert reader.get_counters() == {"requests": 105}
+
+def test_counters_are_flushed_periodically(tmp_path):
+    """Test that the background thread writes counters without an explicit flush."""
+    import time
+
+    path = str(tmp_path / "state.db")
+    state = SharedState(path, flush_interval=0.05)
+    reader = SharedState(path)
+    state.increment("requests", 3)
+
+    deadline = time.time() + 5
+    while not reader.get_counters() and time.time() < deadline:
+        time.sleep(0.02)
+    assert reader.get_counters() == {"requests": 3}
+    state.close()
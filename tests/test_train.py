@@ -0,0 +1,104 @@
+import os
+import json
+import pytest
+import torch
+from torch.utils.data import DataLoader
+from src.core.data_processor import StreamingSMSDataset
+from src.core.train import (
+    SimpleClassifier, train_model, evaluate_model, train_distributed, parse_args,
+    fit_temperature, compute_thresholds, main
+)
+
+def write_corpus(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            if i % 2:
+                f.write(f"spam\tWIN a FREE prize now txt {i} to claim\n")
+            else:
+                f.write(f"ham\tsee you at lunch tomorrow {i}\n")
+
+def test_train_model_single_process(tmp_path):
+    """Test single-process training with the streaming loader."""
+    path = tmp_path / "corpus.tsv"
+    write_corpus(path, 64)
+    loader = DataLoader(StreamingSMSDataset(str(path), n_features=768, chunk_size=16), batch_size=8)
+    output = tmp_path / "model.pt"
+
+    torch.manual_seed(0)
+    model = SimpleClassifier()
+    train_model(model, loader, loader, torch.device("cpu"), num_epochs=3,
+                learning_rate=1e-2, best_model_path=str(output))
+
+    assert output.exists()
+    accuracy, report = evaluate_model(model, loader, torch.device("cpu"))
+    assert accuracy > 0.9
+    assert "Spam" in report
+    assert evaluate_model(model, loader, torch.device("cpu"), report=False)[1] is None
+
+def test_train_distributed_two_workers(tmp_path):
+    """Test CPU data-parallel training across two gloo processes."""
+    path = tmp_path / "corpus.tsv"
+    write_corpus(path, 50)
+    output = tmp_path / "model.pt"
+    calibration = tmp_path / "calibration.json"
+
+    args = parse_args([
+        "--data", str(path), "--val-data", str(path), "--output", str(output),
+        "--calibration-output", str(calibration),
+        "--workers", "2", "--threads", "1", "--epochs", "1", "--batch-size", "4",
+        "--master-port", "29517"
+    ])
+    train_distributed(args)
+
+    assert output.exists()
+    state_dict = torch.load(str(output))
+    assert state_dict["fc1.weight"].shape == (256, 768)
+    assert "0.99" in json.loads(calibration.read_text())["thresholds"]
+
+def test_main_single_process(tmp_path):
+    """Test the single-process path: split, train, calibrate and evaluate."""
+    path = tmp_path / "corpus.tsv"
+    write_corpus(path, 100)
+    output = tmp_path / "model.pt"
+    calibration = tmp_path / "calibration.json"
+
+    main([
+        "--data", str(path), "--output", str(output), "--calibration-output", str(calibration),
+        "--threads", "1", "--epochs", "2", "--batch-size", "8", "--model-version", "3"
+    ])
+
+    assert torch.load(str(output))["fc1.weight"].shape == (256, 768)
+    result = json.loads(calibration.read_text())
+    assert result["model_version"] == 3
+    assert "0.99" in result["thresholds"]
+
+def test_threads_default_splits_cores_between_workers(monkeypatch):
+    """Test that worker processes share the cores instead of each taking half."""
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+
+    assert parse_args(["--workers", "4"]).threads == 2
+    assert parse_args(["--workers", "16"]).threads == 1
+    assert parse_args([]).threads == 8
+    assert parse_args(["--workers", "4", "--threads", "3"]).threads == 3
+
+def test_fit_temperature_softens_overconfident_logits():
+    """Test that temperature scaling cools down overconfident, often wrong logits."""
+    torch.manual_seed(0)
+    labels = torch.randint(0, 2, (400,))
+    noisy = torch.where(torch.rand(400) < 0.2, 1 - labels, labels)
+    logits = torch.nn.functional.one_hot(noisy, 2).float() * 10
+
+    assert fit_temperature(logits, labels) > 2
+
+def test_compute_thresholds_reach_target_precision():
+    """Test that confident regions meet the target precision."""
+    probs = [0.01, 0.02, 0.1, 0.4, 0.5, 0.6, 0.9, 0.97, 0.99]
+    labels = [0, 0, 0, 1, 0, 1, 1, 1, 1]
+    thresholds = compute_thresholds(probs, labels, target_precision=1.0)
+
+    assert thresholds["spam_threshold"] == 0.6
+    assert thresholds["ham_threshold"] == pytest.approx(0.1)
+
+    never = compute_thresholds([0.5, 0.5], [0, 1], target_precision=1.0)
+    assert never["spam_threshold"] > 1
+    assert never["ham_threshold"] < 0
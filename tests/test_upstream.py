@@ -0,0 +1,146 @@
+import asyncio
+import random
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from src.core import DeepSeekMCPClient, DeepSeekMCPError, UpstreamPool
+from src.core.upstream import Endpoint
+
+class FakeUpstream:
+    """Local OpenAI-compatible server with configurable latency and status."""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        self.server = TestServer(app)
+
+    async def handle(self, request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await request.json()
+            await asyncio.sleep(self.delay)
+            if self.status != 200:
+                return web.Response(status=self.status, text="Upstream error")
+            content = '{"label": "ham", "score": 0.1}'
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+        finally:
+            self.in_flight -= 1
+
+    @property
+    def url(self):
+        return str(self.server.make_url("/v1"))
+
+@pytest_asyncio.fixture
+async def upstreams():
+    servers = [FakeUpstream(), FakeUpstream()]
+    for upstream in servers:
+        await upstream.server.start_server()
+    yield servers
+    for upstream in servers:
+        await upstream.server.close()
+
+def make_client(base_urls):
+    client = DeepSeekMCPClient(api_key="test-key", base_urls=base_urls)
+    client.pool.rng = random.Random(0)
+    return client
+
+@pytest.mark.asyncio
+async def test_prefers_faster_endpoint(upstreams):
+    """Test that EWMA latency routing sends most traffic to the faster endpoint."""
+    fast, slow = upstreams
+    slow.delay = 0.05
+    client = make_client([fast.url, slow.url])
+
+    for i in range(20):
+        await client.process_text(f"Message {i}")
+    await client.session.close()
+
+    assert fast.calls + slow.calls == 20
+    assert fast.calls > 3 * slow.calls
+    stats = {s["url"]: s for s in client.get_usage_stats()["upstreams"]}
+    assert stats[slow.url]["latency_ewma"] > stats[fast.url]["latency_ewma"]
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_is_ejected_and_recovers(upstreams):
+    """Test failover away from an erroring endpoint and its later recovery."""
+    healthy, broken = upstreams
+    broken.status = 503
+    client = make_client([healthy.url, broken.url])
+    client.pool.failure_threshold = 2
+    client.pool.ejection_time = 0.2
+
+    # Concurrent requests spread over both endpoints before either has a sample
+    results = await asyncio.gather(*(client.process_text(f"Message {i}") for i in range(10)))
+    assert all(results)
+    stats = client.pool.get_stats()
+    assert stats[1]["ejected"]
+    assert stats[1]["failures"] == broken.calls >= 2
+    assert healthy.calls == 10
+
+    calls = broken.calls
+    # Once the ejection expires the endpoint is probed again
+    broken.status = 200
+    await asyncio.sleep(0.25)
+    for i in range(10, 14):
+        await client.process_text(f"Message {i}")
+    await client.session.close()
+
+    stats = client.pool.get_stats()
+    assert not stats[1]["ejected"]
+    assert stats[1]["ejections"] == 0
+    assert broken.calls > calls
+
+@pytest.mark.asyncio
+async def test_all_endpoints_failing(upstreams):
+    """Test that an error is raised when every endpoint fails."""
+    for upstream in upstreams:
+        upstream.status = 502
+    client = make_client([upstream.url for upstream in upstreams])
+
+    with pytest.raises(DeepSeekMCPError):
+        await client.process_text.retry_with(stop=lambda state: True, reraise=True)(client, "Message")
+    await client.session.close()
+
+    assert sum(upstream.calls for upstream in upstreams) == client.max_retries
+
+@pytest.mark.asyncio
+async def test_per_endpoint_concurrency_limit(upstreams):
+    """Test that in-flight requests never exceed an endpoint's max_concurrency."""
+    upstream = upstreams[0]
+    upstream.delay = 0.02
+    client = make_client([{"url": upstream.url, "max_concurrency": 2}])
+
+    results = await asyncio.gather(*(client.process_text(f"Message {i}") for i in range(8)))
+    await client.session.close()
+
+    assert len(results) == 8
+    assert upstream.calls == 8
+    assert upstream.max_in_flight == 2
+    assert client.pool.get_stats()[0]["in_flight"] == 0
+
+def test_pool_requires_endpoints():
+    """Test that an empty pool is rejected."""
+    with pytest.raises(ValueError):
+        UpstreamPool([])
+
+@pytest.mark.asyncio
+async def test_recovered_endpoint_is_not_flooded():
+    """Test that an endpoint without a latency sample is costed at the pool median."""
+    endpoints = [Endpoint("http://a/v1"), Endpoint("http://b/v1"), Endpoint("http://c/v1")]
+    endpoints[0].latency_ewma = 0.1
+    endpoints[1].latency_ewma = 0.3
+    pool = UpstreamPool(endpoints, rng=random.Random(0))
+
+    picks = [await pool.acquire() for _ in range(60)]
+
+    # Costed at zero, the unsampled endpoint would win every comparison it is in
+    assert picks.count(endpoints[2]) < 30
+    assert picks.count(endpoints[0]) > picks.count(endpoints[2]) > picks.count(endpoints[1])